@@ -1,15 +1,30 @@
 import asyncio, httpx, yaml, time, os, subprocess
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, Response
 from fastapi.staticfiles import StaticFiles
+from starlette.middleware.gzip import GZipMiddleware
 
 from . import docker_logs 
 from . import system_service_version as system_service_version_api
 from . import system_logs 
 from . import ip_leases_mod
-# from . import jenkins_deploys      
+from . import http_pool
+from . import systemd_state
+from . import dpkg_index
+from . import docker_engine
+from . import kea_client
+from . import jenkins_client
+from . import health_history
+from . import metrics
+from . import profiling
+from . import conditional
+from . import fast_json
+from . import host_health
+from .log_hub import Subscription
+from . import jenkins_deploys
 
 
 
@@ -32,10 +47,62 @@ def load_cfg() -> Dict[str, Any]:
 
 cfg = load_cfg()
 
+# systemd target unit'leri (hepsi tek systemctl çağrısında okunur)
+def systemd_unit(t: Dict[str, Any]) -> str:
+    pres = t.get("present") if isinstance(t.get("present"), dict) else {}
+    return pres.get("unit") or f"{t['name']}.service"
+
+systemd_state.register(
+    systemd_unit(t) for t in cfg["targets"]
+    if isinstance(t.get("present"), dict) and t["present"].get("type") == "systemd"
+)
+
+
+
+# Uygulama yaşam döngüsü: probe scheduler'ı başlatır / durdurur
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    http_pool.open_client(int(cfg["timeout_ms"]) / 1000)
+    docker_engine.start()
+    await health_history.start()
+    start_scheduler()
+    jenkins_deploys.store.start()
+    try:
+        yield
+    finally:
+        await stop_scheduler()
+        await jenkins_deploys.store.stop()
+        await health_history.stop()
+        await docker_engine.stop()
+        await kea_client.close()
+        await jenkins_client.close()
+        await http_pool.close_client()
 
 
 # FastAPI uygulaması
-app = FastAPI(title="IFE Health")
+app = FastAPI(title="IFE Health", lifespan=lifespan)
+
+# 1 KB üstü cevaplar gzip'lenir (SSE akışları hariç)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# Profil araçları sadece config'te açıksa (kapalıyken router yok, middleware'de tek bool kontrolü)
+profiling.configure(cfg.get("profiling"))
+if profiling.enabled:
+    app.include_router(profiling.router)
+
+# Handler süreleri (route şablonu ile; eşleşmeyen path'ler tek label'da toplanır)
+@app.middleware("http")
+async def request_timer(request: Request, call_next):
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - t0
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    metrics.HTTP_REQUEST_SECONDS.observe(
+        elapsed, method=request.method, route=route, status=str(response.status_code),
+    )
+    if profiling.enabled:
+        profiling.check_slow(request.method, route, response.status_code, elapsed)
+    return response
 
 # IP Leases Mod router
 app.include_router(ip_leases_mod.router)
@@ -49,7 +116,10 @@ app.include_router(docker_logs.router)
 # System Service Version router
 app.include_router(system_service_version_api.router)
 # Jenkins Deploys router
-# app.include_router(jenkins_deploys.router)
+app.include_router(jenkins_deploys.router)
+
+# Health geçmişi router
+app.include_router(health_history.router)
 
 # System Services router
 from .host_health import router as host_health_router
@@ -85,9 +155,21 @@ from .leases import router as leases_router
 app.include_router(leases_router)
 
 
-# Cache
-_cached: Optional[Dict[str, Any]] = None
-_cached_at: float = 0.0
+# Son probe sonuçları (target adı -> sonuç)
+_snapshot: Dict[str, Dict[str, Any]] = {}
+_checked_at: Dict[str, float] = {}
+
+# Snapshot içeriği her değiştiğinde artar (/api/health ETag'i)
+_snapshot_version = 0
+
+# /api/health/stream aboneleri (probe döngüsü değişiklikleri buraya yazar)
+_health_subs: Set[Subscription] = set()
+
+# Devam eden probe'lar (target adı -> task); eşzamanlı istekler aynı task'ı bekler
+_inflight: Dict[str, "asyncio.Task[Dict[str, Any]]"] = {}
+
+# Target başına arka plan döngüleri
+_loops: List["asyncio.Task[None]"] = []
 
 # Şimdiki zaman (monotonic)
 def now() -> float:
@@ -99,9 +181,10 @@ def get_kernel_version() -> str:
     Host kernel versiyonunu uname -r ile al.
     """
     try:
-        out = subprocess.check_output(
-            ["uname", "-r"], stderr=subprocess.STDOUT
-        )
+        with metrics.subprocess_timer("uname"):
+            out = subprocess.check_output(
+                ["uname", "-r"], stderr=subprocess.STDOUT
+            )
         return out.decode(errors="ignore").strip()
     except Exception as e:
         return f"unknown ({e.__class__.__name__})"
@@ -144,64 +227,126 @@ def get_distro_info() -> Dict[str, Optional[str]]:
         "id_like": id_like
     }
 
+# Kernel/dağıtım çalışma süresince değişmez; uname bir kez çağrılır
+_system_info: Optional[Dict[str, Any]] = None
+
+def system_info() -> Dict[str, Any]:
+    global _system_info
+    if _system_info is None:
+        distro = get_distro_info()
+        _system_info = {
+            "kernel": get_kernel_version(),
+            "pretty_name": distro.get("pretty_name"),
+            "version_codename": distro.get("version_codename"),
+            "id_like": distro.get("id_like"),
+        }
+    return _system_info
+
 # System info API
 @app.get("/api/system-info")
 def api_system_info():
-    distro = get_distro_info()
-    return {
-        "kernel": get_kernel_version(),
-        "pretty_name": distro.get("pretty_name"),
-        "version_codename": distro.get("version_codename"),
-        "id_like": distro.get("id_like"),
-    }
+    return system_info()
 
 
 # Yardımcı kontroller
 async def tcp_check(host: str, port: int, timeout_ms: int) -> Optional[str]:
+    t0 = time.perf_counter()
     try:
         r, w = await asyncio.wait_for(
             asyncio.open_connection(host, port),
             timeout_ms/1000
         )
-        w.close()
-        try: await w.wait_closed()
-        except: pass
-        return None
     except Exception as e:
+        # Reddedilen / zaman aşımına uğrayan bağlantı latency'ye karışmasın
+        _observe_tcp(host, port, t0, "error")
         return str(e)
+    _observe_tcp(host, port, t0, "ok")
+    w.close()
+    try: await w.wait_closed()
+    except: pass
+    return None
+
+def _observe_tcp(host: str, port: int, t0: float, outcome: str) -> None:
+    metrics.PROBE_STAGE_SECONDS.observe(
+        time.perf_counter() - t0, endpoint=f"{host}:{port}", kind="tcp", stage="connect", outcome=outcome,
+    )
+
+# httpcore trace event'lerinden aşama süreleri: connect, tls, ttfb (istek başından
+# header'lar gelene kadar), total. Havuzdan gelen bağlantıda connect/tls olmaz.
+# Başarısız aşamalar outcome="error" ile ayrı tutulur.
+class _ProbeTrace:
+    STAGES = {
+        "connection.connect_tcp": "connect",
+        "connection.start_tls": "tls",
+    }
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.t0 = time.perf_counter()
+        self._started: Dict[str, float] = {}
+        # TCP bağlantısı kuruldu mu / hangi aşama başarısız oldu
+        self.tcp_connected = False
+        self.failed_stage: Optional[str] = None
+
+    async def __call__(self, event: str, info: Dict[str, Any]) -> None:
+        name, _, phase = event.rpartition(".")
+        t = time.perf_counter()
+        if phase == "started":
+            self._started[name] = t
+        elif phase == "complete":
+            if name == "connection.connect_tcp":
+                self.tcp_connected = True
+            stage = self.STAGES.get(name)
+            if stage and name in self._started:
+                self._observe(stage, t - self._started[name])
+            elif name.endswith("receive_response_headers"):
+                self._observe("ttfb", t - self.t0)
+        elif phase == "failed":
+            stage = self.STAGES.get(name)
+            self.failed_stage = self.failed_stage or stage
+            if stage and name in self._started:
+                self._observe(stage, t - self._started[name], "error")
+
+    def _observe(self, stage: str, secs: float, outcome: str = "ok") -> None:
+        metrics.PROBE_STAGE_SECONDS.observe(secs, endpoint=self.endpoint, kind="http", stage=stage, outcome=outcome)
+
+    def done(self, outcome: str = "ok") -> None:
+        self._observe("total", time.perf_counter() - self.t0, outcome)
 
 # HTTP KONTROLÜ
 async def http_check(host: str, port: int, path: str, timeout_ms: int,
                      tls: bool, expect: Optional[List[int]]):
+    """
+    Paylaşılan client üzerinden tek bağlantı denemesi. Sonuçtaki
+    `connected` alanı TCP bağlantısının kurulup kurulamadığını gösterir,
+    böylece aynı target için ayrıca tcp_check yapılmaz. TLS el sıkışması
+    hatası da httpx'te ConnectError'dır; port yine açık sayılır ve
+    `tls_failed` ile ayrıca işaretlenir.
+    """
     url = f"{'https' if tls else 'http'}://{host}:{port}{path if path.startswith('/') else '/'+path}"
+    trace = _ProbeTrace(f"{host}:{port}")
     try:
-        async with httpx.AsyncClient(timeout=timeout_ms/1000) as cli:
-            r = await cli.get(url)
+        r = await http_pool.client().get(url, timeout=timeout_ms/1000, extensions={"trace": trace})
+        trace.done()
 
         st = r.status_code
         ok = st in (expect or [200,301,302,401,403])
-        return {"http_ok": ok, "status": st}
-
+        return {"http_ok": ok, "status": st, "connected": True}
+
+    except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+        trace.done("error")
+        res = {"http_ok": False, "error": str(e) or e.__class__.__name__, "connected": trace.tcp_connected}
+        if trace.failed_stage == "tls":
+            res["tls_failed"] = True
+        return res
     except Exception as e:
-        return {"http_ok": False, "error": str(e)}
+        trace.done("error")
+        return {"http_ok": False, "error": str(e) or e.__class__.__name__, "connected": True}
 
 
 def get_pkg_version(pkg: str) -> Optional[str]:
-    try:
-        out = subprocess.check_output(
-            f"dpkg -l {pkg}",
-            shell=True, stderr=subprocess.STDOUT
-        ).decode(errors="ignore").strip()
-
-        for line in out.splitlines():
-            if line.startswith("ii"):
-                parts = line.split()
-                if len(parts) >= 3:
-                    return parts[2]  # version
-    except Exception:
-        return None
-
-    return None
+    # dpkg status indeksinden (process başlatmadan)
+    return dpkg_index.pkg_version(pkg)
 
 # IP adresi çekme
 @app.get("/api/client-ip")
@@ -218,45 +363,21 @@ def api_client_ip(request: Request):
 # systemctl versiyon çekme
 def fetch_version_systemctl(unit_name: str) -> Optional[str]:
     """
-    systemctl -> FragmentPath -> dpkg -S -> dpkg -l zinciri ile otomatik versiyon çıkarır.
+    FragmentPath (systemd_state) -> sahibi paket -> versiyon zinciri ile otomatik versiyon çıkarır.
     """
-    try:
-        # Unit path
-        out = subprocess.check_output(
-            f"systemctl show {unit_name} --property=FragmentPath",
-            shell=True, stderr=subprocess.STDOUT
-        ).decode(errors="ignore").strip()
-
-        if "=" not in out:
-            return None
-        
-        frag_path = out.split("=", 1)[1].strip()
-
-        # Bu hizmet hangi paketten geliyor?
-        out = subprocess.check_output(
-            f"dpkg -S {frag_path}",
-            shell=True, stderr=subprocess.STDOUT
-        ).decode(errors="ignore").strip()
-
-        pkg = out.split(":", 1)[0].strip()
-
-        # Paket versiyonu al
-        out = subprocess.check_output(
-            f"dpkg -l {pkg}",
-            shell=True, stderr=subprocess.STDOUT
-        ).decode(errors="ignore")
-
-        for line in out.splitlines():
-            if line.startswith("ii "):
-                parts = line.split()
-                if len(parts) >= 3:
-                    return parts[2]
-
+    st = systemd_state.unit_states([unit_name]).get(unit_name)
+    frag_path = (st or {}).get("fragment_path")
+    if not frag_path:
         return None
 
-    except Exception:
+    # Bu hizmet hangi paketten geliyor?
+    pkg = dpkg_index.owner(frag_path)
+    if not pkg:
         return None
 
+    # Paket versiyonu al
+    return dpkg_index.pkg_version(pkg)
+
 
 # HTTP version çekme 
 async def fetch_version_http(t: Dict[str, Any], timeout_ms: int) -> Optional[str]:
@@ -274,8 +395,7 @@ async def fetch_version_http(t: Dict[str, Any], timeout_ms: int) -> Optional[str
     url = f"{'https' if tls else 'http'}://{host}:{port}{vpath}"
 
     try:
-        async with httpx.AsyncClient(timeout=timeout_ms/1000) as cli:
-            r = await cli.get(url)
+        r = await http_pool.client().get(url, timeout=timeout_ms/1000)
     except:
         return None
 
@@ -299,15 +419,8 @@ async def fetch_version_http(t: Dict[str, Any], timeout_ms: int) -> Optional[str
 async def check_one(t: Dict[str, Any], timeout_ms: int) -> Dict[str, Any]:
     res: Dict[str, Any] = {"present": True}
     
-    # --- Port Kontrolü (TCP) ---
-    # TCP KONTROLÜ
-    err = await tcp_check(str(t["host"]), int(t["port"]), timeout_ms)
-    res["port_ok"] = (err is None)
-    if err:
-        res.setdefault("errors", {})["port"] = err
-
     # --- HTTP Kontrolü ---
-    # HTTP KONTROLÜ 
+    # HTTP hedeflerde port durumu da aynı bağlantı denemesinden çıkarılır
     has_http = bool(t.get("http_path") or t.get("expect_status") or t.get("tls"))
     if has_http:
         h = await http_check(
@@ -315,10 +428,25 @@ async def check_one(t: Dict[str, Any], timeout_ms: int) -> Dict[str, Any]:
             str(t.get("http_path") or "/"),
             timeout_ms, bool(t.get("tls")), t.get("expect_status")
         )
+        connected = h.pop("connected")
+        tls_failed = h.pop("tls_failed", False)
+        res["port_ok"] = connected
         res.update(h)
         if "error" in h:
+            if not connected:
+                res.setdefault("errors", {})["port"] = h["error"]
+            if tls_failed:
+                res.setdefault("errors", {})["tls"] = h["error"]
             res.setdefault("errors", {})["http"] = h["error"]
 
+    # --- Port Kontrolü (TCP) ---
+    # Sadece HTTP kontrolü olmayan hedefler için
+    else:
+        err = await tcp_check(str(t["host"]), int(t["port"]), timeout_ms)
+        res["port_ok"] = (err is None)
+        if err:
+            res.setdefault("errors", {})["port"] = err
+
         # --- 3. VERSION (sadece config'ten al) ---
     res["version"] = t.get("version")
 
@@ -330,7 +458,7 @@ async def check_one(t: Dict[str, Any], timeout_ms: int) -> Dict[str, Any]:
     version = None
     pkg = t.get("pkg")
     if pkg:
-        version = get_pkg_version(pkg)  
+        version = await asyncio.to_thread(get_pkg_version, pkg)
 
     res["version"] = version  
 
@@ -346,18 +474,8 @@ async def check_one(t: Dict[str, Any], timeout_ms: int) -> Dict[str, Any]:
     
     # SYSTEMD VARLIK KONTROLÜ
     def present_systemd():
-        unit = pres.get("unit") or f"{t['name']}.service"
-        try:
-            # is-active 0 dönerse çalışıyordur
-            rc = subprocess.call(
-                f"systemctl is-active --quiet {unit}", 
-                shell=True, 
-                stdout=subprocess.DEVNULL, 
-                stderr=subprocess.DEVNULL
-            )
-            return rc == 0
-        except:
-            return False
+        # ortak sağlayıcı: TTL cache + tek batch systemctl çağrısı
+        return bool(systemd_state.is_active(systemd_unit(t)))
 
     # FILE VARLIK KONTROLÜ
     def present_file():
@@ -369,7 +487,7 @@ async def check_one(t: Dict[str, Any], timeout_ms: int) -> Dict[str, Any]:
     elif ptype == "http": 
         res["present"] = bool(res.get("http_ok")) if has_http else present_auto()
     elif ptype == "systemd": 
-        res["present"] = present_systemd()
+        res["present"] = await asyncio.to_thread(present_systemd)
     elif ptype == "file": 
         res["present"] = present_file()
     else: 
@@ -379,36 +497,214 @@ async def check_one(t: Dict[str, Any], timeout_ms: int) -> Dict[str, Any]:
 
 
 
+# TEK TARGET PROBE (single-flight)
+async def probe(t: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Aynı target için devam eden bir probe varsa yenisini başlatmaz,
+    onun sonucunu bekler. Sonuç snapshot'a yazılır.
+    """
+    name = t["name"]
+    task = _inflight.get(name)
+    if task is None or task.done():
+        task = asyncio.create_task(_probe(t))
+        _inflight[name] = task
+    # Bekleyen istek iptal edilse bile probe yarıda kalmasın
+    return await asyncio.shield(task)
+
+async def _probe(t: Dict[str, Any]) -> Dict[str, Any]:
+    global _snapshot_version
+    t0 = time.perf_counter()
+    res = await check_one(t, int(cfg["timeout_ms"]))
+    # Süre snapshot'a girmez (her probe'da değişir, ETag/geçişleri bozar); geçmişe ve metriklere yazılır
+    elapsed = time.perf_counter() - t0
+    metrics.PROBE_SECONDS.observe(elapsed, target=t["name"])
+    health_history.record(t["name"], res, elapsed * 1000)
+    prev = _snapshot.get(t["name"])
+    _snapshot[t["name"]] = res
+    _checked_at[t["name"]] = now()
+    if prev != res:
+        _snapshot_version += 1
+        _publish_health(t["name"], prev, res)
+    return res
+
+# Target durumu değiştiğinde tüm abonelere tek event (izleyici sayısı probe sayısını etkilemez)
+def _publish_health(name: str, prev: Optional[Dict[str, Any]], res: Dict[str, Any]) -> None:
+    if not _health_subs:
+        return
+    ev = {"type": "transition", "version": _snapshot_version, "target": name, "prev": prev, "result": res}
+    for sub in _health_subs:
+        sub.put([ev])
+
 # TÜM SERVİSLER CHECK
 async def perform() -> Dict[str, Any]:
     ts = cfg["targets"]
-    rs = await asyncio.gather(*[check_one(t, int(cfg["timeout_ms"])) for t in ts])
+    rs = await asyncio.gather(*[probe(t) for t in ts])
     return {t["name"]: r for t, r in zip(ts, rs)}
 
-# Cache'li sonuç
-def cached() -> Dict[str, Any]:
-    global _cached, _cached_at
-    if _cached and (now() - _cached_at) < int(cfg["cache_secs"]):
-        return _cached
-    data = asyncio.run(perform())
-    _cached, _cached_at = data, now()
-    return data
+# Snapshot'taki sonuçlar (config sırasıyla)
+def snapshot() -> Dict[str, Any]:
+    return {t["name"]: _snapshot[t["name"]] for t in cfg["targets"] if t["name"] in _snapshot}
+
+async def health_snapshot() -> Dict[str, Any]:
+    # Scheduler ilk turu bitirmediyse eksik target'ları bekle (in-flight probe'a katılır)
+    missing = [t for t in cfg["targets"] if t["name"] not in _snapshot]
+    if missing:
+        await asyncio.gather(*[probe(t) for t in missing])
+    return snapshot()
+
+
+# ARKA PLAN SCHEDULER
+def probe_interval(t: Dict[str, Any]) -> float:
+    """
+    Target'a özel `interval_secs`, yoksa global `cache_secs`.
+    """
+    return max(float(t.get("interval_secs") or cfg["cache_secs"]), 0.5)
+
+async def _probe_loop(t: Dict[str, Any]) -> None:
+    interval = probe_interval(t)
+    while True:
+        try:
+            await probe(t)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"probe hatası ({t.get('name')}): {e}")
+        await asyncio.sleep(interval)
+
+def start_scheduler() -> None:
+    for t in cfg["targets"]:
+        _loops.append(asyncio.create_task(_probe_loop(t)))
+
+async def stop_scheduler() -> None:
+    for task in _loops:
+        task.cancel()
+    await asyncio.gather(*_loops, return_exceptions=True)
+    _loops.clear()
 
 
 # API ROUTES
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/health")
 def liveness():
     return {"status": "up"}
 
-# API health check
+# API health check (sadece snapshot okur)
 @app.get("/api/health")
-def api_health():
-    return JSONResponse(content=cached())
+async def api_health(request: Request):
+    await health_snapshot()
+    # Snapshot değişmediyse gövde serileştirilmeden 304
+    etag = conditional.make_etag("health", conditional.BOOT_ID, _snapshot_version)
+    return conditional.json_response(request, snapshot(), etag)
+
+# Health SSE: önce tam snapshot, sonra sadece target geçişleri
+HEALTH_KEEPALIVE_SECS = 15
+
+@app.get("/api/health/stream")
+async def api_health_stream():
+    async def event_stream():
+        sub = Subscription()
+        _health_subs.add(sub)
+        try:
+            targets = await health_snapshot()
+            # Sürüm snapshot alındıktan sonra okunur (araya await girmez); bekleme sırasında
+            # olan geçişler snapshot'ta zaten var, tekrar delta olarak gönderilmez
+            first = {"type": "snapshot", "version": _snapshot_version, "targets": targets}
+            yield f"id: {first['version']}\ndata: {fast_json.dumps(first).decode('utf-8')}\n\n"
+            while True:
+                try:
+                    batch = await asyncio.wait_for(sub.get(), timeout=HEALTH_KEEPALIVE_SECS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                for ev in batch:
+                    if ev["version"] <= first["version"]:
+                        continue
+                    yield f"id: {ev['version']}\ndata: {fast_json.dumps(ev).decode('utf-8')}\n\n"
+        finally:
+            _health_subs.discard(sub)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
 
-# API force run
+# API force run (devam eden probe'lar varsa onlara katılır)
 @app.post("/api/run")
 async def api_run():
     data = await perform()
-    global _cached, _cached_at
-    _cached, _cached_at = data, now()
     return JSONResponse(content=data)
+
+
+# DASHBOARD
+# index.html'in ihtiyaç duyduğu tüm bölümler tek snapshot'ta; her bölüm
+# ortak cache'lerden (systemd_state, docker event cache, probe snapshot) okunur.
+DASHBOARD_MIN_SECS = 1.0   # bu süreden sık yeniden toplanmaz
+DASHBOARD_PUSH_SECS = 2.0  # SSE değişiklik kontrol aralığı
+
+_dashboard: Dict[str, Any] = {"version": 0, "sections": {}, "hashes": {}, "at": 0.0}
+_dashboard_lock = asyncio.Lock()
+
+async def _section(fn) -> Any:
+    try:
+        return await fn()
+    except HTTPException as e:
+        return {"error": e.detail}
+    except Exception as e:
+        return {"error": str(e)}
+
+def _system_service_version() -> Dict[str, Any]:
+    return {"version": system_service_version_api.get_system_service_version()}
+
+async def dashboard_refresh() -> Dict[str, Any]:
+    """
+    Bölümleri eşzamanlı toplar; herhangi bir bölüm değiştiyse version artar.
+    Eşzamanlı istekler aynı toplamayı paylaşır.
+    """
+    async with _dashboard_lock:
+        if now() - _dashboard["at"] < DASHBOARD_MIN_SECS:
+            return _dashboard
+
+        sources = {
+            "system_services": lambda: asyncio.to_thread(host_health.list_services),
+            "docker_services": docker_engine.list_containers,
+            "health": health_snapshot,
+            "system_info": lambda: asyncio.to_thread(system_info),
+            "system_service_version": lambda: asyncio.to_thread(_system_service_version),
+        }
+        values = await asyncio.gather(*[_section(fn) for fn in sources.values()])
+
+        changed = False
+        for name, value in zip(sources, values):
+            h = conditional.make_etag(fast_json.dumps(value))
+            if _dashboard["hashes"].get(name) != h:
+                _dashboard["hashes"][name] = h
+                _dashboard["sections"][name] = value
+                changed = True
+        if changed:
+            _dashboard["version"] += 1
+        _dashboard["at"] = now()
+        return _dashboard
+
+@app.get("/api/dashboard")
+async def api_dashboard(request: Request):
+    d = await dashboard_refresh()
+    etag = conditional.make_etag("dashboard", conditional.BOOT_ID, d["version"])
+    return conditional.json_response(request, {"version": d["version"], "sections": d["sections"]}, etag)
+
+# Dashboard SSE: ilk mesaj tüm bölümler (full=true), sonrakiler sadece değişen bölümler
+@app.get("/api/dashboard/stream")
+async def api_dashboard_stream():
+    async def event_stream():
+        sent: Dict[str, str] = {}
+        while True:
+            d = await dashboard_refresh()
+            changed = {n: d["sections"][n] for n, h in d["hashes"].items() if sent.get(n) != h}
+            if changed:
+                msg = {"version": d["version"], "full": not sent, "sections": changed}
+                sent.update({n: d["hashes"][n] for n in changed})
+                yield f"id: {d['version']}\ndata: {fast_json.dumps(msg).decode('utf-8')}\n\n"
+            else:
+                yield ": keepalive\n\n"
+            await asyncio.sleep(DASHBOARD_PUSH_SECS)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
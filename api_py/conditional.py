@@ -0,0 +1,82 @@
+"""
+Sık poll edilen JSON endpoint'leri için ETag / If-None-Match (304).
+
+- `json_response()`: gövdeyi bir kez serileştirir, ETag'i gövdenin
+  hash'inden üretir (ya da çağıranın verdiği ucuz sürüm etiketini kullanır).
+- Etiket istemcinin If-None-Match'iyle eşleşirse gövde gönderilmez, 304 döner.
+- Sıkıştırma app seviyesinde GZipMiddleware ile yapılır.
+"""
+
+import hashlib
+import os
+from typing import Any, Iterable, Optional
+
+from fastapi import Request, Response
+
+from . import fast_json
+
+# Tarayıcı cache'lesin ama her kullanımda doğrulasın
+CACHE_CONTROL = "no-cache"
+
+# Sürüm sayacından üretilen etiketler restart sonrası çakışmasın
+BOOT_ID = os.urandom(6).hex()
+
+
+def make_etag(*parts: Any, weak: bool = False) -> str:
+    """
+    Verilen parçaların (sürüm sayacı, sorgu parametreleri vb.) kısa hash'i.
+    """
+    h = hashlib.blake2b(digest_size=12)
+    for p in parts:
+        h.update(p if isinstance(p, bytes) else repr(p).encode("utf-8"))
+        h.update(b"\0")
+    tag = f'"{h.hexdigest()}"'
+    return f"W/{tag}" if weak else tag
+
+
+def _opaque(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    """
+    If-None-Match karşılaştırması (zayıf karşılaştırma, RFC 9110 13.1.2).
+    """
+    inm = request.headers.get("if-none-match")
+    if not inm:
+        return False
+    if inm.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(t.strip()) for t in inm.split(",")}
+
+
+def _headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers=_headers(etag))
+
+
+def json_response(request: Request, content: Any, etag: Optional[str] = None) -> Response:
+    """
+    content'i JSON döner; etag verilmezse gövde hash'i kullanılır.
+    """
+    if etag is not None and not_modified(request, etag):
+        return not_modified_response(etag)
+    body = fast_json.dumps(content)
+    etag = etag or make_etag(body)
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+    return Response(body, media_type="application/json", headers=_headers(etag))
+
+
+def stream_response(request: Request, etag: str, head: dict, key: str, items: Iterable[Any], fmt: str = "json") -> Response:
+    """
+    fast_json.respond() için ETag'li sürüm (etag sürüm bilgisinden üretilmiş olmalı).
+    """
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+    resp = fast_json.respond(head, key, items, fmt)
+    resp.headers.update(_headers(etag))
+    return resp
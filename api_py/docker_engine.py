@@ -0,0 +1,338 @@
+"""
+Docker Engine API için paylaşılan async client (unix socket üzerinden).
+
+- Tek httpx.AsyncClient, tüm isteklerde tekrar kullanılır.
+- Container listesi tek `/containers/json?all=1` çağrısından gelir.
+- `/events` akışı dinlenerek in-memory container snapshot'ı güncel tutulur;
+  böylece /api/docker-services her istekte container inspect etmez.
+
+App lifespan içinde `start()` / `stop()` çağrılır.
+"""
+
+import asyncio
+import json
+import os
+import re
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import quote
+
+import httpx
+from fastapi import HTTPException
+
+from . import metrics
+
+DOCKER_SOCK = os.getenv("DOCKER_SOCK", "/var/run/docker.sock")
+
+# Metrik label'ı için path'teki container/image referansı: /containers/abc/json -> /containers/{id}/json
+_ENDPOINT_RE = re.compile(r"/(containers|images|exec)/(?!json$)[^/]+(?=/|$)")
+
+DOCKER_TIMEOUT = 10.0
+
+# Snapshot'ı değiştiren container event'leri (exec_*, attach, top vb. hariç)
+STATE_ACTIONS = {
+    "create", "start", "restart", "stop", "die", "kill", "oom",
+    "pause", "unpause", "rename", "update",
+}
+
+_HEALTH_RE = re.compile(r"\((healthy|unhealthy|health: starting)\)")
+
+_client: Optional[httpx.AsyncClient] = None
+_containers: Dict[str, Dict[str, Any]] = {}
+_image_tags: Dict[str, str] = {}   # ImageID -> ilk RepoTag (kullanılmayanlar tam yüklemede silinir)
+_reload_task: Optional["asyncio.Task[None]"] = None
+_synced = False
+_events_task: Optional["asyncio.Task[None]"] = None
+
+# Container id -> event action kuyrukları (lifecycle bekleyenleri için)
+_watchers: Dict[str, List["asyncio.Queue[str]"]] = {}
+
+# Event akışı yokken kullanılan inspect poll aralığı
+FALLBACK_POLL = 0.5
+
+
+def client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(uds=DOCKER_SOCK),
+            base_url="http://docker",
+            timeout=DOCKER_TIMEOUT,
+        )
+    return _client
+
+
+async def request(method: str, path: str, **kwargs) -> httpx.Response:
+    """
+    Docker API isteği; daemon'a ulaşılamazsa 500 fırlatır.
+    """
+    endpoint = _ENDPOINT_RE.sub(r"/\1/{id}", path.split("?", 1)[0])
+    try:
+        with metrics.DOCKER_API_SECONDS.time(method=method, endpoint=endpoint):
+            return await client().request(method, path, **kwargs)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Docker daemon erişilemiyor: {e}")
+
+
+def _error_detail(r: httpx.Response) -> str:
+    try:
+        return r.json().get("message") or r.text
+    except Exception:
+        return r.text
+
+
+async def inspect(ref: str) -> Dict[str, Any]:
+    """
+    ref = name veya full id
+    """
+    r = await request("GET", f"/containers/{quote(ref, safe='')}/json")
+    if r.status_code == 404:
+        raise HTTPException(status_code=404, detail="Container bulunamadı (name veya full id gönder).")
+    if r.status_code >= 400:
+        raise HTTPException(status_code=500, detail=f"Docker hatası: {_error_detail(r)}")
+    return r.json()
+
+
+async def _image_name(c: Dict[str, Any]) -> str:
+    """
+    `Image` alanı imaj tag'siz çalıştırıldıysa / tag taşındıysa çıplak
+    `sha256:` id olur; o durumda imajın ilk RepoTag'i kullanılır.
+    """
+    image = c.get("Image") or ""
+    if image and not image.startswith("sha256:"):
+        return image
+    image_id = c.get("ImageID") or image
+    if not image_id:
+        return "unknown-image"
+    if image_id not in _image_tags:
+        r = await request("GET", f"/images/{quote(image_id, safe='')}/json")
+        tags = r.json().get("RepoTags") if r.status_code < 400 else None
+        _image_tags[image_id] = tags[0] if tags else "unknown-image"
+    return _image_tags[image_id]
+
+
+# /containers/json elemanını API item'ına çevirir
+async def _summary(c: Dict[str, Any]) -> Dict[str, Any]:
+    names = c.get("Names") or []
+    status_text = c.get("Status") or ""
+    m = _HEALTH_RE.search(status_text)
+    health = None
+    if m:
+        health = "starting" if m.group(1) == "health: starting" else m.group(1)
+    state = c.get("State")
+    return {
+        "id": c.get("Id"),                 # FULL ID
+        "name": (names[0].lstrip("/") if names else c.get("Id", "")[:12]),
+        "image": await _image_name(c),
+        "status": state,
+        "health": health,
+        "running": state == "running",
+        "kind": "docker",
+    }
+
+
+async def _list_raw(filters: Optional[Dict[str, List[str]]] = None) -> List[Dict[str, Any]]:
+    params: Dict[str, Any] = {"all": "1"}
+    if filters:
+        params["filters"] = json.dumps(filters)
+    r = await request("GET", "/containers/json", params=params)
+    if r.status_code >= 400:
+        raise HTTPException(status_code=500, detail=f"Docker hatası: {_error_detail(r)}")
+    return r.json()
+
+
+async def _do_reload() -> None:
+    global _containers
+    items = await _list_raw()
+    fresh: Dict[str, Dict[str, Any]] = {}
+    for c in items:
+        s = await _summary(c)
+        fresh[s["id"]] = s
+    # Okuyucular yarım dolmuş dict görmesin: tek atamada değiştir
+    _containers = fresh
+
+    used = {c.get("ImageID") or c.get("Image") for c in items}
+    for image_id in [k for k in _image_tags if k not in used]:
+        del _image_tags[image_id]
+
+
+async def _reload_all() -> None:
+    """
+    Tam listeyi yeniden yükler; eşzamanlı çağrılar aynı yüklemeyi bekler.
+    """
+    global _reload_task
+    if _reload_task is None or _reload_task.done():
+        _reload_task = asyncio.create_task(_do_reload())
+    # Bekleyen istek iptal edilse bile yükleme yarıda kalmasın
+    await asyncio.shield(_reload_task)
+
+
+async def _refresh_one(cid: str) -> None:
+    items = await _list_raw({"id": [cid]})
+    if items:
+        s = await _summary(items[0])
+        _containers[s["id"]] = s
+    else:
+        _containers.pop(cid, None)
+
+
+async def _on_event(ev: Dict[str, Any]) -> None:
+    action = ev.get("Action") or ev.get("status") or ""
+    cid = ev.get("id") or (ev.get("Actor") or {}).get("ID")
+    if not cid:
+        return
+
+    for q in _watchers.get(cid, ()):
+        q.put_nowait(action)
+
+    if action == "destroy":
+        _containers.pop(cid, None)
+    elif action.startswith("health_status"):
+        # "health_status: healthy" -> ek API çağrısı gerekmez
+        item = _containers.get(cid)
+        if item is not None:
+            health = action.split(":", 1)[1].strip() if ":" in action else None
+            item["health"] = health
+        else:
+            await _refresh_one(cid)
+    elif action in STATE_ACTIONS:
+        await _refresh_one(cid)
+
+
+async def _watch_events() -> None:
+    global _synced
+    backoff = 1.0
+    params = {"filters": json.dumps({"type": ["container"]})}
+    while True:
+        try:
+            async with client().stream("GET", "/events", params=params, timeout=None) as r:
+                r.raise_for_status()
+                # Akış açıldıktan sonra tam liste: arada kaçan event olmaz
+                await _reload_all()
+                _synced = True
+                backoff = 1.0
+                async for line in r.aiter_lines():
+                    if not line:
+                        continue
+                    try:
+                        await _on_event(json.loads(line))
+                    except (ValueError, HTTPException):
+                        continue
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Docker event akışı koptu: {e}")
+        finally:
+            _synced = False
+        await asyncio.sleep(backoff)
+        backoff = min(backoff * 2, 30.0)
+
+
+async def list_containers() -> List[Dict[str, Any]]:
+    """
+    Event akışı aktifse snapshot'tan, değilse tek /containers/json çağrısından.
+    """
+    if not _synced:
+        await _reload_all()
+    return [dict(c) for c in _containers.values()]
+
+
+@contextmanager
+def watch(cid: str) -> Iterator["asyncio.Queue[str]"]:
+    """
+    Container event'lerini dinleyen kuyruk. Aksiyondan ÖNCE açılmalı ki
+    aksiyonun ürettiği event kaçmasın.
+    """
+    q: "asyncio.Queue[str]" = asyncio.Queue()
+    _watchers.setdefault(cid, []).append(q)
+    try:
+        yield q
+    finally:
+        qs = _watchers.get(cid, [])
+        if q in qs:
+            qs.remove(q)
+        if not qs:
+            _watchers.pop(cid, None)
+
+
+async def wait_until(
+    cid: str,
+    q: "asyncio.Queue[str]",
+    actions: Iterable[str],
+    predicate: Callable[[Dict[str, Any]], bool],
+    timeout: float,
+) -> bool:
+    """
+    predicate(inspect) True olana kadar bekler. Event akışı aktifse sadece
+    `actions` içindeki event'lerde inspect yapılır; değilse kısa aralıklarla
+    (event loop'u bloklamadan) inspect edilir.
+    """
+    actions = set(actions)
+    loop = asyncio.get_running_loop()
+    end = loop.time() + timeout
+
+    if predicate(await inspect(cid)):
+        return True
+
+    while True:
+        remaining = end - loop.time()
+        if remaining <= 0:
+            return False
+
+        if _synced:
+            try:
+                action = await asyncio.wait_for(q.get(), remaining)
+            except asyncio.TimeoutError:
+                return False
+            if action not in actions and action.split(":", 1)[0] not in actions:
+                continue
+        else:
+            await asyncio.sleep(min(FALLBACK_POLL, remaining))
+
+        if predicate(await inspect(cid)):
+            return True
+
+
+async def logs_tail(cid: str, n: int = 80, tty: bool = False) -> str:
+    """
+    Container loglarının son n satırı. TTY olmayan container'larda Docker
+    stdout/stderr'i 8 byte başlıklı çerçevelerle gönderir; burada ayrıştırılır.
+    """
+    try:
+        r = await request(
+            "GET", f"/containers/{cid}/logs",
+            params={"stdout": "1", "stderr": "1", "tail": str(n)},
+        )
+    except HTTPException:
+        return ""
+    if r.status_code >= 400:
+        return ""
+
+    data = r.content
+    if tty:
+        return data.decode("utf-8", errors="replace")
+
+    out = bytearray()
+    i = 0
+    while i + 8 <= len(data):
+        size = int.from_bytes(data[i + 4:i + 8], "big")
+        out += data[i + 8:i + 8 + size]
+        i += 8 + size
+    return out.decode("utf-8", errors="replace")
+
+
+def start() -> None:
+    global _events_task
+    if _events_task is None or _events_task.done():
+        _events_task = asyncio.create_task(_watch_events())
+
+
+async def stop() -> None:
+    global _events_task, _client
+    if _events_task is not None:
+        _events_task.cancel()
+        await asyncio.gather(_events_task, return_exceptions=True)
+        _events_task = None
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -1,19 +1,31 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 import asyncio
-import docker
+import os
 from pathlib import Path
 import json
 import re  # Regex kütüphanesini ekledik
-from typing import AsyncIterator, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from . import docker_engine
+from . import file_follow
+from . import fast_json
+from .log_hub import hub
 
 router = APIRouter(
     prefix="/api/docker-logs",
     tags=["docker-logs"],
+    default_response_class=fast_json.FastJSONResponse,
 )
 
-# tail: 0 veya negatif verilirse -> tüm satırlar
-DEFAULT_TAIL = 0
+# Varsayılan olarak son 1000 kayıt döner; tail: 0 veya negatif verilirse -> tüm satırlar
+DEFAULT_TAIL = 1000
+
+# Dosya sonundan geriye doğru okuma blok boyutu
+READ_BLOCK = 64 * 1024
+
+# since cursor'ından sonra tek istekte okunacak azami byte; aşılırsa tail'e düşülür
+MAX_SINCE_BYTES = 8 * 1024 * 1024
 
 # ANSI renk kodlarını yakalayan regex deseni
 ANSI_ESCAPE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
@@ -42,97 +54,170 @@ def format_log_entry(raw_line: str) -> Optional[str]:
         # JSON bozuksa satırı olduğu gibi ama temizleyerek dön
         return ANSI_ESCAPE.sub('', line)
 
-def read_log_file_lines(path: Path, tail: int) -> List[str]:
-    if not path.exists():
-        raise FileNotFoundError(f"Log dosyası bulunamadı: {path}")
-
+def _tail_raw_lines(path: Path, n: int) -> Tuple[List[bytes], int, int]:
+    """
+    Dosyanın sonundan geriye doğru bloklar halinde okur, sadece son n tam
+    satırı döner (dosyanın tamamı okunmaz).
+    Dönüş: (satırlar, inode, son tam satırın bittiği offset)
+    """
+    chunks: List[bytes] = []
+    newlines = 0
+
+    with path.open("rb") as f:
+        inode = os.fstat(f.fileno()).st_ino
+        pos = end = f.seek(0, 2)
+        # Son satır '\n' ile bitiyorsa sayılmaz; n+1 satır sonu = n tam satır
+        while pos > 0 and newlines <= n:
+            step = min(READ_BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step)
+            chunks.append(chunk)
+            newlines += chunk.count(b"\n")
+
+    data = b"".join(reversed(chunks))
+    lines = data.split(b"\n")
+    # Henüz yazılmakta olan (\n ile bitmeyen) son satır cursor'a dahil edilmez
+    end -= len(lines.pop())
+    if pos > 0:
+        lines = lines[1:]  # yarım kalan ilk satır
+    lines = [l for l in lines if l.strip()]
+    return lines[-n:], inode, end
+
+def _format_raw(raw_lines: List[bytes]) -> List[str]:
     formatted_lines: List[str] = []
+    for raw in raw_lines:
+        formatted = format_log_entry(raw.decode("utf-8", errors="ignore"))
+        if formatted:
+            formatted_lines.append(formatted)
+    return formatted_lines
 
-    with path.open("r", encoding="utf-8", errors="ignore") as f:
-        for line in f:
-            formatted = format_log_entry(line)
+def _read_all(path: Path) -> Tuple[List[str], int, int]:
+    formatted_lines: List[str] = []
+    offset = 0
+    with path.open("rb") as f:
+        inode = os.fstat(f.fileno()).st_ino
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            offset += len(raw)
+            formatted = format_log_entry(raw.decode("utf-8", errors="ignore"))
             if formatted:
                 formatted_lines.append(formatted)
+    return formatted_lines, inode, offset
 
-    if tail and tail > 0 and len(formatted_lines) > tail:
-        return formatted_lines[-tail:]
+def read_log_file_lines(path: Path, tail: int) -> List[str]:
+    return read_log_chunk(path, tail)["lines"]
 
-    return formatted_lines
+def read_log_chunk(path: Path, tail: int, since: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Son `tail` kayıt (tail <= 0: tüm dosya) veya `since` cursor'ından
+    ("inode:offset") sonra eklenen kayıtlar.
+
+    Dönüş: {"lines", "cursor", "incremental"}; cursor bir sonraki istekte
+    `since` olarak gönderilir. Dosya rotate/truncate olduysa ya da cursor çok
+    gerideyse incremental=False ile tail döner (istemci görünümü sıfırlamalı).
+    """
+    if not path.exists():
+        raise FileNotFoundError(f"Log dosyası bulunamadı: {path}")
+
+    if since:
+        try:
+            inode_s, offset_s = since.split(":", 1)
+            inode, offset = int(inode_s), int(offset_s)
+        except ValueError:
+            raise ValueError(f"Geçersiz since cursor: {since}")
+
+        with path.open("rb") as f:
+            st = os.fstat(f.fileno())
+            if st.st_ino == inode and offset <= st.st_size and st.st_size - offset <= MAX_SINCE_BYTES:
+                f.seek(offset)
+                data = f.read(st.st_size - offset)
+                complete, _, _ = data.rpartition(b"\n")
+                if complete:
+                    offset += len(complete) + 1
+                lines = _format_raw([l for l in complete.split(b"\n") if l.strip()])
+                if tail and tail > 0:
+                    lines = lines[-tail:]
+                return {"lines": lines, "cursor": f"{inode}:{offset}", "incremental": True}
+
+    # Sadece son `tail` kayıt parse edilir
+    if tail and tail > 0:
+        raw_lines, inode, offset = _tail_raw_lines(path, tail)
+        lines = _format_raw(raw_lines)
+    else:
+        lines, inode, offset = _read_all(path)
+
+    return {"lines": lines, "cursor": f"{inode}:{offset}", "incremental": False}
 
 # SSE formatında mesaj paketler
 def _sse_pack(message: str) -> str:
     clean = message.replace("\r", "")
     return "".join(f"data: {line}\n" for line in clean.split("\n")) + "\n"
 
-# Belirtilen container'ın loglarının son n satırını döner
-@router.get("/{container_name}")
-def get_docker_logs(container_name: str, tail: int = DEFAULT_TAIL):
-    try:
-        client = docker.from_env()
-        container = client.containers.get(container_name)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-    attrs = getattr(container, "attrs", {}) or {}
+# Container'ın json-file log yolunu döner
+async def _log_path(container_name: str) -> Path:
+    attrs = await docker_engine.inspect(container_name)
     log_path_str = attrs.get("LogPath")
 
     if not log_path_str:
         raise HTTPException(status_code=500, detail="LogPath bulunamadı.")
 
-    log_path = Path(log_path_str)
+    return Path(log_path_str)
+
+# Belirtilen container'ın loglarının son n satırını döner
+# since: önceki cevaptaki cursor -> sadece yeni satırlar döner
+@router.get("/{container_name}")
+async def get_docker_logs(container_name: str, tail: int = DEFAULT_TAIL, since: Optional[str] = None, format: str = "json"):
+    log_path = await _log_path(container_name)
 
     try:
-        lines = read_log_file_lines(log_path, tail)
+        chunk = await asyncio.to_thread(read_log_chunk, log_path, tail, since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    return {
+    lines = chunk["lines"]
+    head = {
         "container": container_name,
         "tail": tail,
         "count": len(lines),
-        "lines": lines,
+        "cursor": chunk["cursor"],
+        "incremental": chunk["incremental"],
     }
+    return fast_json.respond(head, "lines", lines, format)
 
 # Belirtilen container'ın log akışı döner
 @router.get("/{container_name}/stream")
 async def stream_docker_logs(container_name: str, tail: int = 200):
-    try:
-        client = docker.from_env()
-        container = client.containers.get(container_name)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-    attrs = getattr(container, "attrs", {}) or {}
-    log_path_str = attrs.get("LogPath")
-
-    if not log_path_str:
-        raise HTTPException(status_code=500, detail="LogPath bulunamadı.")
+    log_path = await _log_path(container_name)
 
-    log_path = Path(log_path_str)
+    # Tüm izleyiciler aynı dosya follower'ını paylaşır
+    async def upstream() -> AsyncIterator[List[str]]:
+        async for batch in file_follow.follow(log_path):
+            formatted = [f for f in map(format_log_entry, batch) if f]
+            if formatted:
+                yield formatted
 
     async def event_stream() -> AsyncIterator[str]:
-        # Geçmiş loglar
-        try:
-            if tail and tail > 0:
-                for line in read_log_file_lines(log_path, tail):
-                    yield _sse_pack(line)
-        except Exception:
-            yield _sse_pack("Log geçmişi okunamadı.")
-
-        # Canlı loglar
-        try:
-            with log_path.open("r", encoding="utf-8", errors="ignore") as handle:
-                handle.seek(0, 2)
+        async with hub.subscribe(("docker", str(log_path)), upstream) as sub:
+            # Geçmiş loglar
+            try:
+                if tail and tail > 0:
+                    for line in await asyncio.to_thread(read_log_file_lines, log_path, tail):
+                        yield _sse_pack(line)
+            except Exception:
+                yield _sse_pack("Log geçmişi okunamadı.")
+
+            # Canlı loglar (birlikte gelen satırlar tek SSE frame'de)
+            try:
                 while True:
-                    raw_line = handle.readline()
-                    if not raw_line:
-                        await asyncio.sleep(0.5)
-                        continue
-                    
-                    formatted = format_log_entry(raw_line)
-                    if formatted:
-                        yield _sse_pack(formatted)
-        except asyncio.CancelledError:
-            return
+                    lines = await sub.get()
+                    if not lines:
+                        return
+                    yield _sse_pack("\n".join(lines))
+            except asyncio.CancelledError:
+                return
 
     return StreamingResponse(event_stream(), media_type="text/event-stream")
\ No newline at end of file
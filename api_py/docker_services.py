@@ -1,212 +1,258 @@
-import time
-import docker
-from fastapi import APIRouter, HTTPException
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Literal
+
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel, Field
+
+from . import conditional
+from . import docker_engine
 
 router = APIRouter(prefix="/api/docker-services", tags=["docker-services"])
 
-# Docker client objesini döner, erişilemiyorsa 500 hatası fırlatır
-def _client():
-    try:
-        c = docker.from_env()
-        c.ping()
-        return c
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Docker daemon erişilemiyor: {e}")
-    
-# Belirtilen ref (name veya full id) ile container objesini döner
-def _get_container(client, ref: str):
-    try:
-        # ref = full id veya name kullan.
-        return client.containers.get(ref)
-    except docker.errors.NotFound as e:
-        raise HTTPException(status_code=404, detail="Container bulunamadı (name veya full id gönder).") from e
-    except docker.errors.DockerException as e:
-        raise HTTPException(status_code=500, detail=f"Docker hatası: {e}") from e
+# Lifecycle bekleme süresi (sn)
+WAIT_TIMEOUT = 30
+STOP_TIMEOUT = 15
+RESTART_TIMEOUT = 3
+
+# Bulk işlemlerde aynı anda çalışacak container işlemi üst sınırı
+BULK_MAX_CONCURRENCY = 8
 
 # Container state bilgisini döner
-def _state(container):
-    container.reload()
-    st = container.attrs.get("State", {}) or {}
+def _state(attrs: Dict[str, Any]):
+    st = attrs.get("State", {}) or {}
     status = st.get("Status")              # running/exited/restarting/...
     health = (st.get("Health") or {}).get("Status")  # healthy/unhealthy/starting
     exit_code = st.get("ExitCode")
     err = st.get("Error")
     return status, health, exit_code, err
 
-# Belirtilen predicate fonksiyonu timeout süresi içinde True dönerse True, aksi halde False döner
-def _wait(container, predicate, timeout=20, poll=0.5):
-    end = time.time() + timeout
-    last = None
-    while time.time() < end:
-        last = predicate()
-        if last:
-            return True
-        time.sleep(poll)
-    return False
+def _name(attrs: Dict[str, Any]) -> str:
+    return (attrs.get("Name") or "").lstrip("/")
+
+def _has_healthcheck(attrs: Dict[str, Any]) -> bool:
+    return bool((attrs.get("State") or {}).get("Health"))
 
 # Container loglarının son n satırını döner
-def _tail_logs(container, n=80):
-    try:
-        return container.logs(tail=n).decode("utf-8", errors="replace")
-    except Exception:
-        return ""
-    
-# Tüm docker containerları listeler
+async def _tail_logs(attrs: Dict[str, Any], n=80) -> str:
+    tty = bool((attrs.get("Config") or {}).get("Tty"))
+    return await docker_engine.logs_tail(attrs["Id"], n=n, tty=tty)
+
+# Docker aksiyonu (start/stop/restart) gönderir; hata olursa 500 fırlatır
+async def _post_action(cid: str, action: str, label: str, **params) -> None:
+    timeout = float(params.get("t", 0)) + docker_engine.DOCKER_TIMEOUT
+    r = await docker_engine.request(
+        "POST", f"/containers/{cid}/{action}",
+        params={k: str(v) for k, v in params.items()},
+        timeout=timeout,
+    )
+    # 304: zaten istenen durumda
+    if r.status_code >= 400:
+        raise HTTPException(
+            status_code=500,
+            detail=f"{label} komutu verilemedi: {docker_engine._error_detail(r)}",
+        )
+
+# Aksiyonu gönderir ve ilgili event'ler gelene kadar (timeout'lu) bekler
+async def _act_and_wait(
+    attrs: Dict[str, Any],
+    send: Callable[[], Awaitable[None]],
+    actions: List[str],
+    predicate: Callable[[Dict[str, Any]], bool],
+) -> bool:
+    cid = attrs["Id"]
+    with docker_engine.watch(cid) as q:
+        await send()
+        return await docker_engine.wait_until(cid, q, actions, predicate, WAIT_TIMEOUT)
+
+def _is_running(attrs: Dict[str, Any]) -> bool:
+    return _state(attrs)[0] == "running"
+
+def _is_exited(attrs: Dict[str, Any]) -> bool:
+    return _state(attrs)[0] == "exited"
+
+def _is_healthy(attrs: Dict[str, Any]) -> bool:
+    status, health, _, _ = _state(attrs)
+    # Sağlık kontrolü olmayan container'da running yeterli
+    return status == "running" and health in (None, "healthy")
+
+def _result(attrs: Dict[str, Any]) -> Dict[str, Any]:
+    s, h, _, _ = _state(attrs)
+    return {"id": attrs["Id"], "name": _name(attrs), "status": s, "health": h}
+
+# Running sonrası state tazeler; istenirse healthcheck sonucunu (health_status event) bekler
+async def _ensure_running(attrs: Dict[str, Any], wait_health: bool) -> Dict[str, Any]:
+    attrs = await docker_engine.inspect(attrs["Id"])
+    if wait_health and _has_healthcheck(attrs) and _is_running(attrs):
+        cid = attrs["Id"]
+        with docker_engine.watch(cid) as q:
+            await docker_engine.wait_until(cid, q, ["health_status", "die"], _is_healthy, WAIT_TIMEOUT)
+        attrs = await docker_engine.inspect(cid)
+    return attrs
+
+def _not_running_error(attrs: Dict[str, Any], message: str, logs: str) -> HTTPException:
+    s, h, ec, er = _state(attrs)
+    return HTTPException(
+        status_code=409,
+        detail={
+            "message": message,
+            "status": s, "health": h, "exit_code": ec, "error": er,
+            "logs_tail": logs[-4000:],
+        },
+    )
+
+def _stop_timeout_error(attrs: Dict[str, Any]) -> HTTPException:
+    s, h, ec, er = _state(attrs)
+    return HTTPException(
+        status_code=409,
+        detail={
+            "message": "Container stop tamamlanmadı (timeout).",
+            "status": s, "health": h, "exit_code": ec, "error": er,
+        },
+    )
+
+# Tüm docker containerları listeler (event akışıyla güncel tutulan snapshot'tan)
 @router.get("")
-def list_docker_services():
-    client = _client()
-    items = []
-    for c in client.containers.list(all=True):
-        c.reload()
-        st = c.attrs.get("State", {}) or {}
-        items.append({
-            "id": c.id,                 # FULL ID
-            "name": c.name,
-            "image": (c.image.tags[0] if c.image.tags else "unknown-image"),
-            "status": st.get("Status"),
-            "health": (st.get("Health") or {}).get("Status"),
-            "running": st.get("Status") == "running",
-            "kind": "docker",
-        })
-    return items
+async def list_docker_services(request: Request):
+    return conditional.json_response(request, await docker_engine.list_containers())
 
 # Stop-Start endpointi
 @router.post("/{ref}/stop-start")
-def stop_start_container(ref: str):
-    client = _client()
-    container = _get_container(client, ref)
+async def stop_start_container(ref: str, wait_health: bool = False):
+    attrs = await docker_engine.inspect(ref)
+    cid = attrs["Id"]
 
-    status, health, exit_code, err = _state(container)
+    status, health, exit_code, err = _state(attrs)
 
     # Eğer çalışıyorsa önce STOP et
     if status in ("running", "restarting"):
-        container.stop(timeout=15)
+        ok = await _act_and_wait(
+            attrs,
+            lambda: _post_action(cid, "stop", "Stop", t=STOP_TIMEOUT),
+            ["die", "stop"], _is_exited,
+        )
+        attrs = await docker_engine.inspect(cid)
 
-        # Durduğundan emin ol
-        ok = _wait(container, lambda: _state(container)[0] == "exited", timeout=30)
-        
         # Eğer durmazsa hata ver
         if not ok:
-            s, h, ec, er = _state(container)
-            raise HTTPException(
-                status_code=409,
-                detail={
-                    "message": "Container stop tamamlanmadı (timeout).",
-                    "status": s, "health": h, "exit_code": ec, "error": er
-                },
-            )
-        
+            raise _stop_timeout_error(attrs)
+
         # Durduktan sonra state al
-        return {"id": container.id, "name": container.name, "status": s, "health": h}
+        return _result(attrs)
 
 
     # START
     # Böylece hem durmuş olanlar başlar, hem de yukarıda durdurduklarımız tekrar başlar.
-    try:
-        container.start()
-    except Exception as e:
-         raise HTTPException(status_code=500, detail=f"Start komutu verilemedi: {e}")
-
-    # Çalıştığından emin ol
-    ok = _wait(container, lambda: _state(container)[0] == "running", timeout=30)
-    s, h, ec, er = _state(container)
+    ok = await _act_and_wait(
+        attrs,
+        lambda: _post_action(cid, "start", "Start"),
+        ["start", "die"], _is_running,
+    )
+    attrs = await _ensure_running(attrs, wait_health)
 
     # Sadece 'ok' False ise hata fırlatıyoruz.
     if not ok:
-        logs = _tail_logs(container, n=120)
-        raise HTTPException(
-            status_code=409,
-            detail={
-                "message": "Container running durumuna gelemedi (muhtemel crash/config/port hatası).",
-                "status": s, "health": h, "exit_code": ec, "error": er,
-                "logs_tail": logs[-4000:], 
-            },
+        logs = await _tail_logs(attrs, n=120)
+        raise _not_running_error(
+            attrs, "Container running durumuna gelemedi (muhtemel crash/config/port hatası).", logs
         )
 
-    
-    return {"id": container.id, "name": container.name, "status": s, "health": h}
+    return _result(attrs)
 
 # Tek tek start/stop için endpointler de ekleme
 @router.post("/{ref}/start")
-def start_container(ref: str):
-    client = _client()
-    container = _get_container(client, ref)
+async def start_container(ref: str, wait_health: bool = False):
+    attrs = await docker_engine.inspect(ref)
+    cid = attrs["Id"]
 
-    status, health, exit_code, err = _state(container)
-    if status == "running":
-        return {"id": container.id, "name": container.name, "status": status, "health": health}
+    if _is_running(attrs):
+        return _result(attrs)
 
-    try:
-        container.start()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Start komutu verilemedi: {e}")
-
-    ok = _wait(container, lambda: _state(container)[0] == "running", timeout=30)
-    s, h, ec, er = _state(container)
+    ok = await _act_and_wait(
+        attrs,
+        lambda: _post_action(cid, "start", "Start"),
+        ["start", "die"], _is_running,
+    )
+    attrs = await _ensure_running(attrs, wait_health)
     if not ok:
-        logs = _tail_logs(container, n=120)
-        raise HTTPException(
-            status_code=409,
-            detail={
-                "message": "Container running durumuna gelemedi (muhtemel crash/config/port hatası).",
-                "status": s, "health": h, "exit_code": ec, "error": er,
-                "logs_tail": logs[-4000:],
-            },
+        logs = await _tail_logs(attrs, n=120)
+        raise _not_running_error(
+            attrs, "Container running durumuna gelemedi (muhtemel crash/config/port hatası).", logs
         )
 
-    return {"id": container.id, "name": container.name, "status": s, "health": h}
+    return _result(attrs)
 
 # Tek tek start/stop için endpointler de ekleme
 @router.post("/{ref}/restart")
-def restart_container(ref: str):
-    client = _client()
-    container = _get_container(client, ref)
+async def restart_container(ref: str, wait_health: bool = False):
+    attrs = await docker_engine.inspect(ref)
+    cid = attrs["Id"]
 
-    try:
-        container.restart(timeout=3)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Restart komutu verilemedi: {e}")
+    # restart öncesi de running olabilir; yeni 'start' event'i beklenir
+    with docker_engine.watch(cid) as q:
+        await _post_action(cid, "restart", "Restart", t=RESTART_TIMEOUT)
+        ok = await docker_engine.wait_until(cid, q, ["start", "die"], _is_running, WAIT_TIMEOUT)
 
-    ok = _wait(container, lambda: _state(container)[0] == "running", timeout=30)
-    s, h, ec, er = _state(container)
+    attrs = await _ensure_running(attrs, wait_health)
     if not ok:
-        logs = _tail_logs(container, n=120)
-        raise HTTPException(
-            status_code=409,
-            detail={
-                "message": "Container restart sonrası running durumuna gelemedi (muhtemel crash/config/port hatası).",
-                "status": s, "health": h, "exit_code": ec, "error": er,
-                "logs_tail": logs[-4000:],
-            },
+        logs = await _tail_logs(attrs, n=120)
+        raise _not_running_error(
+            attrs, "Container restart sonrası running durumuna gelemedi (muhtemel crash/config/port hatası).", logs
         )
 
-    return {"id": container.id, "name": container.name, "status": s, "health": h}
+    return _result(attrs)
 
 
 # Tek tek start/stop için endpointler de ekleme
 @router.post("/{ref}/stop")
-def stop_container(ref: str):
-    client = _client()
-    container = _get_container(client, ref)
+async def stop_container(ref: str):
+    attrs = await docker_engine.inspect(ref)
+    cid = attrs["Id"]
 
-    status, health, exit_code, err = _state(container)
+    status, health, exit_code, err = _state(attrs)
     if status not in ("running", "restarting"):
-        return {"id": container.id, "name": container.name, "status": status, "health": health}
-
-    try:
-        container.stop(timeout=15)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Stop komutu verilemedi: {e}")
+        return _result(attrs)
 
-    ok = _wait(container, lambda: _state(container)[0] == "exited", timeout=30)
-    s, h, ec, er = _state(container)
+    ok = await _act_and_wait(
+        attrs,
+        lambda: _post_action(cid, "stop", "Stop", t=STOP_TIMEOUT),
+        ["die", "stop"], _is_exited,
+    )
+    attrs = await docker_engine.inspect(cid)
     if not ok:
-        raise HTTPException(
-            status_code=409,
-            detail={
-                "message": "Container stop tamamlanmadı (timeout).",
-                "status": s, "health": h, "exit_code": ec, "error": er,
-            },
-        )
+        raise _stop_timeout_error(attrs)
+
+    return _result(attrs)
+
+
+# Toplu işlem isteği
+class BulkAction(BaseModel):
+    action: Literal["start", "stop", "restart", "stop-start"]
+    refs: List[str] = Field(..., min_length=1)
+    concurrency: int = Field(4, ge=1, le=BULK_MAX_CONCURRENCY)
+    wait_health: bool = False
+
+# Birden fazla container'ı aynı anda (concurrency sınırıyla) start/stop/restart eder
+@router.post("/bulk")
+async def bulk_container_action(req: BulkAction):
+    handlers = {
+        "start": lambda ref: start_container(ref, wait_health=req.wait_health),
+        "stop": stop_container,
+        "restart": lambda ref: restart_container(ref, wait_health=req.wait_health),
+        "stop-start": lambda ref: stop_start_container(ref, wait_health=req.wait_health),
+    }
+    handler = handlers[req.action]
+    sem = asyncio.Semaphore(req.concurrency)
+
+    async def run(ref: str) -> Dict[str, Any]:
+        async with sem:
+            try:
+                return {"ref": ref, "ok": True, "result": await handler(ref)}
+            except HTTPException as e:
+                return {"ref": ref, "ok": False, "status_code": e.status_code, "error": e.detail}
 
-    return {"id": container.id, "name": container.name, "status": s, "health": h}
\ No newline at end of file
+    results = await asyncio.gather(*[run(ref) for ref in dict.fromkeys(req.refs)])
+    return {
+        "action": req.action,
+        "ok": all(r["ok"] for r in results),
+        "items": results,
+    }
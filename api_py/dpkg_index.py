@@ -0,0 +1,134 @@
+"""
+Mount edilmiş dpkg veritabanından process başlatmadan paket bilgisi okur.
+
+- /var/lib/dpkg/status        -> paket -> versiyon
+- /var/lib/dpkg/info/*.list   -> dosya yolu -> sahibi olan paket
+
+İndeks bir kez parse edilir, `status` dosyasının mtime'ı değişince yeniden kurulur.
+Dosya -> paket haritası büyük olduğu için ilk `owner()` çağrısında kurulur.
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+DPKG_DIR = Path("/var/lib/dpkg")
+STATUS_FILE = DPKG_DIR / "status"
+INFO_DIR = DPKG_DIR / "info"
+
+_lock = threading.Lock()
+_status_mtime: Optional[float] = None
+_versions: Dict[str, str] = {}
+_owners: Optional[Dict[str, str]] = None
+
+
+def _status_mtime_now() -> Optional[float]:
+    try:
+        return os.stat(STATUS_FILE).st_mtime
+    except OSError:
+        return None
+
+
+def _parse_status() -> Dict[str, str]:
+    """
+    Kurulu paketler için {paket: versiyon}; Multi-Arch paketler
+    hem `paket` hem `paket:arch` anahtarıyla yazılır.
+    """
+    versions: Dict[str, str] = {}
+    fields: Dict[str, str] = {}
+
+    def flush():
+        pkg = fields.get("Package")
+        status = fields.get("Status", "").split()
+        version = fields.get("Version")
+        if pkg and version and status and status[-1] == "installed":
+            versions.setdefault(pkg, version)
+            arch = fields.get("Architecture")
+            if arch:
+                versions[f"{pkg}:{arch}"] = version
+        fields.clear()
+
+    with STATUS_FILE.open("r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            if line == "\n":
+                flush()
+                continue
+            if line[:1] in (" ", "\t") or ":" not in line:
+                continue  # çok satırlı alanlar (Description vb.) gerekmez
+            k, v = line.split(":", 1)
+            if k in ("Package", "Status", "Version", "Architecture"):
+                fields[k] = v.strip()
+    flush()
+    return versions
+
+
+def _parse_lists() -> Dict[str, str]:
+    owners: Dict[str, str] = {}
+    try:
+        entries = list(os.scandir(INFO_DIR))
+    except OSError:
+        return owners
+
+    for e in entries:
+        if not e.name.endswith(".list"):
+            continue
+        pkg = e.name[:-5].split(":", 1)[0]
+        try:
+            with open(e.path, "r", encoding="utf-8", errors="ignore") as f:
+                for line in f:
+                    path = line.rstrip("\n")
+                    if path and path != "/.":
+                        owners.setdefault(path, pkg)
+        except OSError:
+            continue
+    return owners
+
+
+def _ensure_fresh() -> None:
+    """
+    Lock tutulurken çağrılır; status mtime değiştiyse indeksi sıfırlar.
+    """
+    global _status_mtime, _versions, _owners
+    mtime = _status_mtime_now()
+    if mtime is None:
+        _status_mtime, _versions, _owners = None, {}, None
+        return
+    if mtime != _status_mtime:
+        try:
+            _versions = _parse_status()
+        except OSError:
+            _versions = {}
+        _owners = None
+        _status_mtime = mtime
+
+
+def pkg_version(pkg: str) -> Optional[str]:
+    with _lock:
+        _ensure_fresh()
+        return _versions.get(pkg)
+
+
+def _path_variants(path: str):
+    # usrmerge: dpkg /lib/... kaydetmiş olabilir, systemd /usr/lib/... döner (veya tersi)
+    yield path
+    if path.startswith("/usr/"):
+        yield path[4:]
+    else:
+        yield "/usr" + path
+
+
+def owner(path: str) -> Optional[str]:
+    """
+    `dpkg -S <path>` karşılığı.
+    """
+    global _owners
+    with _lock:
+        _ensure_fresh()
+        if _owners is None:
+            _owners = _parse_lists()
+        for p in _path_variants(path):
+            pkg = _owners.get(p)
+            if pkg:
+                return pkg
+    return None
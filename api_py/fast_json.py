@@ -0,0 +1,80 @@
+"""
+Büyük JSON cevapları için hızlı serileştirme.
+
+- `orjson` kuruluysa C encoder, değilse stdlib json kullanılır.
+- Endpoint'ler Response nesnesi döndüğü için FastAPI'nin jsonable_encoder
+  turu (her dict'in tek tek kopyalanması) atlanır.
+- `respond()`: büyük listeyi parça parça JSON dizisi olarak (aynı cevap
+  şekliyle) veya `format=ndjson` ile satır başına bir kayıt olarak akıtır;
+  tüm cevap tek bir bytes olarak bellekte toplanmaz.
+"""
+
+import json
+from typing import Any, Dict, Iterable, Iterator
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Akışta tek parçada serileştirilecek kayıt sayısı
+CHUNK_ITEMS = 1000
+
+FORMATS = ("json", "ndjson")
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _json_chunks(head: Dict[str, Any], key: str, items: Iterable[Any]) -> Iterator[bytes]:
+    # {"count":..,"meta":..,"<key>":[ ... ]}
+    prefix = dumps(head)[:-1]
+    yield prefix + (b"," if len(prefix) > 1 else b"") + dumps(key) + b":["
+    batch = []
+    first = True
+    for item in items:
+        batch.append(dumps(item))
+        if len(batch) >= CHUNK_ITEMS:
+            yield (b"" if first else b",") + b",".join(batch)
+            batch, first = [], False
+    if batch:
+        yield (b"" if first else b",") + b",".join(batch)
+    yield b"]}"
+
+
+def _ndjson_chunks(items: Iterable[Any]) -> Iterator[bytes]:
+    batch = []
+    for item in items:
+        batch.append(dumps(item))
+        if len(batch) >= CHUNK_ITEMS:
+            yield b"\n".join(batch) + b"\n"
+            batch = []
+    if batch:
+        yield b"\n".join(batch) + b"\n"
+
+
+def respond(head: Dict[str, Any], key: str, items: Iterable[Any], fmt: str = "json"):
+    """
+    head + head[key] = items şeklindeki cevabı akıtır. ndjson'da sadece
+    kayıtlar gönderilir, head alanları X-Meta başlığına konur.
+    """
+    if fmt == "ndjson":
+        return StreamingResponse(
+            _ndjson_chunks(items),
+            media_type="application/x-ndjson",
+            headers={"X-Meta": json.dumps(head, default=str)},
+        )
+    if fmt != "json":
+        raise HTTPException(status_code=400, detail=f"Geçersiz format: {fmt} ({', '.join(FORMATS)})")
+    return StreamingResponse(_json_chunks(head, key, items), media_type="application/json")
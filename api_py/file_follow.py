@@ -0,0 +1,197 @@
+"""
+Append-only log dosyaları için async "tail -F".
+
+- Linux'ta dosyanın bulunduğu dizin inotify ile izlenir (ctypes, ek bağımlılık yok);
+  inotify yoksa stat tabanlı hafif polling'e düşer.
+- Okumalar thread'de yapılır, event loop yavaş diskte bloklanmaz.
+- Aynı anda gelen satırlar tek batch olarak döner.
+- Rotation (inode değişimi, ör. `-json.log` -> `-json.log.1`) ve truncation
+  durumunda dosya şeffaf şekilde yeniden açılır. copytruncate sonrası dosya
+  eski boyutuna kadar yeniden yazılmışsa da, okunan son byte'lar (imza)
+  yerinde olmadığı için fark edilir ve baştan okunur.
+
+Kullanım:
+    async for lines in follow(path):
+        ...
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import struct
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Tuple
+
+# inotify sabitleri (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# inotify yokken (veya olay kaçarsa) kontrol aralığı
+POLL_INTERVAL = 0.5
+# inotify varken güvenlik amaçlı periyodik kontrol
+SAFETY_INTERVAL = 5.0
+# Tek okumada alınacak azami byte
+READ_CHUNK = 1024 * 1024
+# Truncation tespiti için saklanan son okunan byte sayısı
+SIGNATURE_BYTES = 64
+
+_EVENT_HDR = struct.calcsize("iIII")
+
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        try:
+            lib = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            lib.inotify_init1.argtypes = [ctypes.c_int]
+            lib.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            _libc = lib
+        except (OSError, AttributeError):
+            _libc = False
+    return _libc or None
+
+
+class _Watcher:
+    """
+    Dizin için inotify izleyici; loop reader'ı ile asyncio.Event tetikler.
+    """
+
+    def __init__(self, directory: Path):
+        self.changed = asyncio.Event()
+        self.fd: Optional[int] = None
+        self._loop = asyncio.get_running_loop()
+
+        libc = _load_libc()
+        if not libc:
+            return
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return
+        if libc.inotify_add_watch(fd, os.fsencode(str(directory)), WATCH_MASK) < 0:
+            os.close(fd)
+            return
+        self.fd = fd
+        self._loop.add_reader(fd, self._on_readable)
+
+    def _on_readable(self) -> None:
+        # Olayların içeriği gerekmez; kuyruk boşaltılır ve okuyucu uyandırılır
+        try:
+            while os.read(self.fd, 64 * _EVENT_HDR + 4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+        self.changed.set()
+
+    async def wait(self) -> None:
+        if self.fd is None:
+            await asyncio.sleep(POLL_INTERVAL)
+            return
+        try:
+            await asyncio.wait_for(self.changed.wait(), SAFETY_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        self.changed.clear()
+
+    def close(self) -> None:
+        if self.fd is not None:
+            self._loop.remove_reader(self.fd)
+            os.close(self.fd)
+            self.fd = None
+
+
+def _read_available(handle, signature: bytes) -> Tuple[bytes, bool]:
+    """
+    Kalınan yerden dosya sonuna kadar okur. Offset'ten önceki byte'lar son
+    okunan imzayla uyuşmuyorsa dosya kesilip yeniden yazılmıştır; baştan
+    okunur ve ikinci değer True döner.
+    """
+    reset = False
+    pos = handle.tell()
+    if signature:
+        handle.seek(pos - len(signature))
+        if handle.read(len(signature)) != signature:
+            handle.seek(0)
+            reset = True
+    parts = []
+    while True:
+        chunk = handle.read(READ_CHUNK)
+        if not chunk:
+            break
+        parts.append(chunk)
+    return b"".join(parts), reset
+
+
+def _open(path: Path, at_end: bool):
+    try:
+        handle = path.open("rb")
+    except FileNotFoundError:
+        return None, None, b""
+    signature = b""
+    if at_end:
+        size = handle.seek(0, 2)
+        handle.seek(max(0, size - SIGNATURE_BYTES))
+        signature = handle.read()
+    return handle, os.fstat(handle.fileno()).st_ino, signature
+
+
+async def follow(path: Path, from_end: bool = True) -> AsyncIterator[List[str]]:
+    """
+    Dosyaya eklenen tam satırları batch'ler halinde verir.
+    """
+    watcher = _Watcher(path.parent)
+    handle, inode, signature = await asyncio.to_thread(_open, path, from_end)
+    pending = b""
+
+    try:
+        while True:
+            if handle is not None:
+                data, reset = await asyncio.to_thread(_read_available, handle, signature)
+                if reset:
+                    pending = b""
+                    signature = b""
+                if data:
+                    signature = (signature + data)[-SIGNATURE_BYTES:]
+                    pending += data
+                    *complete, pending = pending.split(b"\n")
+                    lines = [l.decode("utf-8", errors="ignore") for l in complete if l.strip()]
+                    if lines:
+                        yield lines
+                    continue
+
+            # Rotation / truncation kontrolü
+            try:
+                st = await asyncio.to_thread(os.stat, path)
+            except FileNotFoundError:
+                st = None
+
+            if st is not None:
+                if handle is None or st.st_ino != inode:
+                    # Eski dosyada kalanlar yukarıda okundu; yenisini baştan aç
+                    if handle is not None:
+                        handle.close()
+                    handle, inode, signature = await asyncio.to_thread(_open, path, False)
+                    pending = b""
+                    continue
+                if st.st_size < handle.tell():
+                    handle.seek(0)
+                    pending = b""
+                    signature = b""
+                    continue
+
+            await watcher.wait()
+    finally:
+        watcher.close()
+        if handle is not None:
+            handle.close()
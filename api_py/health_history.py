@@ -0,0 +1,273 @@
+"""
+Health probe sonuçlarının geçmişi (SQLite, WAL modu).
+
+Ham örnek saklanmaz; her probe sonucu dakikalık ve saatlik toplam
+tablolarına (upsert) yazılır, durum değişimleri ayrıca tutulur:
+  - minute: son MINUTE_RETENTION_SECS (saat/gün aralıkları)
+  - hour:   son HOUR_RETENTION_SECS (hafta/ay aralıkları)
+  - changes: up/down geçişleri ("ne zaman flapping başladı")
+
+Yazmalar bellekte biriktirilip FLUSH_SECS aralıkla tek transaction'da
+thread'de yapılır; event loop bloklanmaz.
+"""
+
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query
+
+router = APIRouter(prefix="/api/health", tags=["health-history"])
+
+HISTORY_DB = Path(os.getenv("HEALTH_HISTORY_DB", "/var/lib/ife-health/history.db"))
+
+FLUSH_SECS = 5
+MINUTE_RETENTION_SECS = 2 * 86400
+HOUR_RETENTION_SECS = 90 * 86400
+# Bu aralığa kadar dakikalık tablo, üstü saatlik tablo
+MINUTE_TABLE_MAX_SECS = 48 * 3600
+# Cevaptaki azami nokta sayısı (fazlası SQL'de gruplanır)
+MAX_POINTS = 360
+
+RANGE_RE = re.compile(r"^(\d+)([mhd])$")
+RANGE_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS minute (
+    target TEXT NOT NULL, bucket INTEGER NOT NULL,
+    n INTEGER NOT NULL, up INTEGER NOT NULL, port_ok INTEGER NOT NULL, http_ok INTEGER NOT NULL,
+    lat_sum REAL NOT NULL, lat_max REAL NOT NULL,
+    PRIMARY KEY (target, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS hour (
+    target TEXT NOT NULL, bucket INTEGER NOT NULL,
+    n INTEGER NOT NULL, up INTEGER NOT NULL, port_ok INTEGER NOT NULL, http_ok INTEGER NOT NULL,
+    lat_sum REAL NOT NULL, lat_max REAL NOT NULL,
+    PRIMARY KEY (target, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS changes (
+    target TEXT NOT NULL, ts INTEGER NOT NULL, up INTEGER NOT NULL, detail TEXT
+);
+CREATE INDEX IF NOT EXISTS changes_target_ts ON changes (target, ts);
+"""
+
+UPSERT = """
+INSERT INTO {table} (target, bucket, n, up, port_ok, http_ok, lat_sum, lat_max)
+VALUES (?, ?, 1, ?, ?, ?, ?, ?)
+ON CONFLICT (target, bucket) DO UPDATE SET
+    n = n + 1, up = up + excluded.up, port_ok = port_ok + excluded.port_ok,
+    http_ok = http_ok + excluded.http_ok, lat_sum = lat_sum + excluded.lat_sum,
+    lat_max = max(lat_max, excluded.lat_max)
+"""
+
+# (target, ts, up, port_ok, http_ok, latency_ms)
+Sample = Tuple[str, int, int, int, int, float]
+
+_conn: Optional[sqlite3.Connection] = None
+_db_lock = threading.Lock()
+_pending: List[Sample] = []
+_changes: List[Tuple[str, int, int, Optional[str]]] = []
+_last_up: Dict[str, int] = {}
+_task: Optional["asyncio.Task[None]"] = None
+_last_prune = 0.0
+
+
+def _connect() -> Optional[sqlite3.Connection]:
+    global _conn
+    if _conn is None:
+        try:
+            HISTORY_DB.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(HISTORY_DB), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            _conn = conn
+        except (OSError, sqlite3.Error) as e:
+            print(f"health history devre dışı: {e}")
+            return None
+    return _conn
+
+
+def is_up(res: Dict[str, Any]) -> bool:
+    """
+    HTTP kontrolü olan target'ta http_ok, olmayanda port_ok.
+    """
+    if "http_ok" in res:
+        return bool(res.get("http_ok"))
+    return bool(res.get("port_ok"))
+
+
+def record(target: str, res: Dict[str, Any], latency_ms: float) -> None:
+    """
+    Probe sonucunu kuyruğa ekler (event loop'tan çağrılır, IO yapmaz).
+    """
+    ts = int(time.time())
+    up = int(is_up(res))
+    _pending.append((target, ts, up, int(bool(res.get("port_ok"))), int(bool(res.get("http_ok"))), float(latency_ms)))
+    if _last_up.get(target) != up:
+        _last_up[target] = up
+        _changes.append((target, ts, up, None if up else (res.get("error") or str(res.get("errors") or ""))))
+
+
+def _flush(samples: List[Sample], changes: List[Tuple[str, int, int, Optional[str]]]) -> None:
+    global _last_prune
+    conn = _connect()
+    if conn is None:
+        return
+    with _db_lock, conn:
+        for table, size in (("minute", 60), ("hour", 3600)):
+            conn.executemany(
+                UPSERT.format(table=table),
+                [(t, ts - ts % size, up, p, h, lat, lat) for t, ts, up, p, h, lat in samples],
+            )
+        conn.executemany("INSERT INTO changes (target, ts, up, detail) VALUES (?, ?, ?, ?)", changes)
+
+        # Eski satırlar saatte bir silinir
+        if time.monotonic() - _last_prune > 3600:
+            _last_prune = time.monotonic()
+            now = int(time.time())
+            conn.execute("DELETE FROM minute WHERE bucket < ?", (now - MINUTE_RETENTION_SECS,))
+            conn.execute("DELETE FROM hour WHERE bucket < ?", (now - HOUR_RETENTION_SECS,))
+            conn.execute("DELETE FROM changes WHERE ts < ?", (now - HOUR_RETENTION_SECS,))
+
+
+async def flush() -> None:
+    if not _pending and not _changes:
+        return
+    samples, changes = _pending[:], _changes[:]
+    _pending.clear()
+    _changes.clear()
+    await asyncio.to_thread(_flush, samples, changes)
+
+
+async def _flush_loop() -> None:
+    while True:
+        await asyncio.sleep(FLUSH_SECS)
+        try:
+            await flush()
+        except Exception as e:
+            print(f"health history yazılamadı: {e}")
+
+
+def _load_last_up() -> Dict[str, int]:
+    """
+    Her target'ın kayıtlı son durumu; restart sonrası ilk örnek sahte geçiş yazmasın.
+    """
+    conn = _connect()
+    if conn is None:
+        return {}
+    with _db_lock:
+        rows = conn.execute(
+            "SELECT c.target, c.up FROM changes c "
+            "JOIN (SELECT target, MAX(rowid) AS rid FROM changes GROUP BY target) l ON c.rowid = l.rid"
+        ).fetchall()
+    return {t: up for t, up in rows}
+
+
+async def start() -> None:
+    global _task
+    if _task is None:
+        try:
+            _last_up.update(await asyncio.to_thread(_load_last_up))
+        except sqlite3.Error as e:
+            print(f"health history son durumlar okunamadı: {e}")
+        _task = asyncio.create_task(_flush_loop())
+
+
+async def stop() -> None:
+    global _task, _conn
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
+    await flush()
+    if _conn is not None:
+        _conn.close()
+        _conn = None
+
+
+def _parse_range(value: str) -> int:
+    m = RANGE_RE.match(value.strip())
+    if not m:
+        raise HTTPException(status_code=400, detail=f"Geçersiz range: {value} (ör. 1h, 24h, 7d)")
+    secs = int(m.group(1)) * RANGE_UNITS[m.group(2)]
+    if not 0 < secs <= HOUR_RETENTION_SECS:
+        raise HTTPException(status_code=400, detail="range 1m ile 90d arasında olmalı")
+    return secs
+
+
+def _ratio(part: Optional[float], n: Optional[float]) -> Optional[float]:
+    return round(part / n, 4) if n else None
+
+
+def _query(target: Optional[str], secs: int) -> Dict[str, Any]:
+    conn = _connect()
+    if conn is None:
+        raise HTTPException(status_code=503, detail="Health history veritabanı açılamadı")
+
+    now = int(time.time())
+    table, size = ("minute", 60) if secs <= MINUTE_TABLE_MAX_SECS else ("hour", 3600)
+    since = now - secs
+    since -= since % size
+    # Nokta sayısı MAX_POINTS'i geçmesin diye bucket'lar gruplanır
+    step = size * max(1, -(-(secs // size) // MAX_POINTS))
+
+    with _db_lock:
+        summary_rows = conn.execute(
+            f"SELECT target, SUM(n), SUM(up), SUM(lat_sum), MAX(lat_max) FROM {table} "
+            f"WHERE bucket >= ? {'AND target = ?' if target else ''} GROUP BY target ORDER BY target",
+            (since, target) if target else (since,),
+        ).fetchall()
+        points = changes = []
+        if target:
+            points = conn.execute(
+                f"SELECT bucket - bucket % ?, SUM(n), SUM(up), SUM(port_ok), SUM(http_ok), SUM(lat_sum), MAX(lat_max) "
+                f"FROM {table} WHERE target = ? AND bucket >= ? GROUP BY 1 ORDER BY 1",
+                (step, target, since),
+            ).fetchall()
+            changes = conn.execute(
+                "SELECT ts, up, detail FROM changes WHERE target = ? AND ts >= ? ORDER BY ts, rowid",
+                (target, since),
+            ).fetchall()
+
+    items = [
+        {
+            "target": t,
+            "samples": n,
+            "uptime": _ratio(up, n),
+            "latency_avg_ms": round(lat / n, 1) if n else None,
+            "latency_max_ms": round(lmax, 1) if lmax is not None else None,
+        }
+        for t, n, up, lat, lmax in summary_rows
+    ]
+    res: Dict[str, Any] = {"range_secs": secs, "resolution_secs": step, "items": items}
+    if target:
+        res["points"] = [
+            {
+                "ts": ts,
+                "samples": n,
+                "uptime": _ratio(up, n),
+                "port_ok": _ratio(p, n),
+                "http_ok": _ratio(h, n),
+                "latency_avg_ms": round(lat / n, 1) if n else None,
+                "latency_max_ms": round(lmax, 1),
+            }
+            for ts, n, up, p, h, lat, lmax in points
+        ]
+        res["changes"] = [{"ts": ts, "up": bool(up), "detail": d} for ts, up, d in changes]
+    return res
+
+
+@router.get("/history", summary="Target bazlı uptime / latency geçmişi")
+async def health_history(
+    target: Optional[str] = None,
+    range_: str = Query("24h", alias="range", description="ör. 1h, 24h, 7d, 30d"),
+):
+    secs = _parse_range(range_)
+    await flush()
+    return await asyncio.to_thread(_query, target, secs)
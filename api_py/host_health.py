@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 Host üzerindeki core servislerin (bind9, kea, nginx, system-service) durumunu
-systemctl üzerinden kontrol eder.
+systemctl üzerinden (systemd_state ortak sağlayıcısı ile, tek çağrıda) kontrol eder.
 
 - CLI:
     python -m api_py.host_health
@@ -10,11 +10,13 @@ systemctl üzerinden kontrol eder.
     /api/system-services
 """
 
-import subprocess
 import json
 from typing import List, Dict
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+
+from . import conditional
+from . import systemd_state
 
 router = APIRouter(
     prefix="/api/system-services",
@@ -45,32 +47,17 @@ SERVICES = [
     },
 ]
 
+systemd_state.register(s["unit"] for s in SERVICES)
+
+
 def check_systemd(unit: str) -> str:
     """
-    systemctl is-active <unit>
+    ActiveState == active -> up
     """
-    
-    CMD = "/usr/bin/systemctl"  
-    
-    try:
-        res = subprocess.run(
-            [CMD, "is-active", unit],
-            capture_output=True,
-            text=True,
-            check=False,
-        )
-        
-        output = res.stdout.strip()
-        
-        if res.returncode == 0 and output == "active":
-            return "up"
-        else:
-            return "down"
-            
-    except FileNotFoundError:
-        return "unknown"
-    except Exception as e:
+    active = systemd_state.is_active(unit)
+    if active is None:
         return "unknown"
+    return "up" if active else "down"
 
 
 def list_services() -> List[Dict]:
@@ -79,6 +66,9 @@ def list_services() -> List[Dict]:
     """
     result: List[Dict] = []
 
+    # Tüm unit'ler tek systemctl çağrısında okunur (sonraki check_systemd'ler cache'ten)
+    systemd_state.unit_states(s["unit"] for s in SERVICES)
+
     for s in SERVICES:
         state = check_systemd(s["unit"])
         result.append(
@@ -95,13 +85,13 @@ def list_services() -> List[Dict]:
 
 
 @router.get("")
-def get_system_services():
+def get_system_services(request: Request):
     """
     API endpoint: GET /api/system-services
     """
     try:
         
-        return list_services()
+        return conditional.json_response(request, list_services())
 
     except Exception as exc:
         print(f"Hata: {exc}")
@@ -0,0 +1,57 @@
+"""
+Outbound HTTP probe'ları için paylaşılan httpx.AsyncClient.
+
+App lifespan içinde `open_client()` ile açılır, `close_client()` ile kapanır.
+Client origin (scheme/host/port) başına keep-alive bağlantı havuzu tutar;
+`h2` paketi kuruluysa TLS hedeflerde HTTP/2 kullanılır.
+"""
+
+from typing import Optional
+
+import httpx
+
+try:
+    import h2  # noqa: F401  (httpx HTTP/2 desteği için)
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+# Havuz limitleri
+MAX_CONNECTIONS = 50
+MAX_KEEPALIVE = 20
+KEEPALIVE_EXPIRY = 30.0
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _build(timeout_s: float) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=timeout_s,
+        http2=HTTP2,
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def open_client(timeout_s: float = 2.0) -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build(timeout_s)
+    return _client
+
+
+def client() -> httpx.AsyncClient:
+    """
+    Paylaşılan client; lifespan dışında (CLI vb.) çağrılırsa tembel açılır.
+    """
+    return open_client()
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -1,89 +1,212 @@
 # api_py/kea_http_leases.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import ipaddress
 import time
-import httpx  # yoksa: pip install httpx
 
-router = APIRouter(prefix="/api/ip", tags=["kea-http-leases"])
+from . import kea_client
+from . import lease_index
+from . import lease_events
+from . import kea_pools
+from . import fast_json
+from . import conditional
+
+router = APIRouter(prefix="/api/ip", tags=["kea-http-leases"], default_response_class=fast_json.FastJSONResponse)
 
 KEA_HTTP_URL = "http://localhost:8000/"  # SENİN VERDİĞİN ENDPOINT
 
-def _normalize_kea(resp_json):
+# Kea'dan çekilen lease tablosu bu süre boyunca indeksten sorgulanır
+CACHE_SECS = 5
+# Aynı anda tutulan azami subnet cache'i (en eski kullanılan atılır)
+SUBNET_CACHE_MAX = 32
+
+def _normalize_lease(l: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Kea control-agent cevabını (lease4-get-all) mevcut UI contract'ına çevirir:
-      {count, items, meta}
+    Tek Kea lease'ini CSV modundaki kayıt formatına çevirir
+    (remaining_secs sorgu anında hesaplanır).
     """
-    if not isinstance(resp_json, list) or not resp_json:
-        raise HTTPException(502, "Kea response beklenen JSON list formatında değil")
+    cltt = l.get("cltt")
+    valid_lft = l.get("valid-lft")
 
-    r0 = resp_json[0]
-    args = (r0.get("arguments") or {})
-    leases = args.get("leases") or []
+    expire = None
+    if isinstance(cltt, int) and isinstance(valid_lft, int):
+        expire = cltt + valid_lft
 
-    now = int(time.time())
-    items = []
+    return {
+        "ip": l.get("ip-address") or "",
+        "mac": (l.get("hw-address") or "").lower(),
+        "client_id": l.get("client-id") or "",
+        "hostname": l.get("hostname") or "",
+        "subnet_id": l.get("subnet-id"),
+        "state": l.get("state", -1),
+        "valid_lft": valid_lft,
+        "expire": expire,
+        "expire_human": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(expire)) if expire else "",
+    }
 
-    for l in leases:
-        ip = l.get("ip-address") or ""
-        mac = (l.get("hw-address") or "").lower()
-        client_id = l.get("client-id") or ""
-        hostname = l.get("hostname") or ""
-        subnet_id = l.get("subnet-id")
-        state = l.get("state", -1)
-
-        cltt = l.get("cltt")
-        valid_lft = l.get("valid-lft")
-
-        expire = None
-        if isinstance(cltt, int) and isinstance(valid_lft, int):
-            expire = cltt + valid_lft
-
-        remaining = (expire - now) if (isinstance(expire, int) and expire > now) else 0
-        expire_human = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(expire)) if expire else ""
-
-        items.append({
-            "ip": ip,
-            "mac": mac,
-            "client_id": client_id,
-            "hostname": hostname,
-            "subnet_id": subnet_id,
-            "state": state,
-            "valid_lft": valid_lft,
-            "expire": expire,
-            "expire_human": expire_human,
-            "remaining_secs": remaining,
-        })
-
-    # IP sort (senin CSV ile aynı davranış)
-    def ipkey(x):
-        try:
-            return list(map(int, str(x["ip"]).split(".")))
-        except:
-            return [999, 999, 999, 999]
-    items.sort(key=ipkey)
+# Kea sayfalarını tek tek normalize eder (tüm cevap bellekte birikmez)
+async def _normalize_pages(pages: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[Dict[str, Any]]:
+    async for page in pages:
+        for l in page:
+            yield _normalize_lease(l)
 
+def _meta_now(**extra) -> Dict[str, Any]:
+    now = int(time.time())
     return {
-        "count": len(items),
-        "items": items,
-        "meta": {
-            "source": "kea-http",
-            "url": KEA_HTTP_URL,
-            "result": r0.get("result"),
-            "text": r0.get("text"),
-            "mtime": now,
-            "mtime_human": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)),
-        }
+        "source": "kea-http",
+        "url": KEA_HTTP_URL,
+        "mtime": now,
+        "mtime_human": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)),
+        **extra,
     }
 
-@router.get("/leases", summary="Kea HTTP endpoint (POST) -> normalize leases")
-def leases_from_kea_http():
-    payload = {"command": "lease4-get-all", "service": ["dhcp4"]}
+_feed = lease_events.LeaseFeed()
+_index = lease_index.LeaseIndex(_feed)
+_meta: Dict[str, Any] = {}
+_fetched_at = 0.0
+_lock = asyncio.Lock()
+
+# Subnet bazlı (lease4-get-all + subnets) LRU cache: subnet id -> (index, meta, zaman)
+_subnet_cache: "OrderedDict[int, Tuple[lease_index.LeaseIndex, Dict[str, Any], float]]" = OrderedDict()
+
+def _fresh(at: float) -> bool:
+    return time.monotonic() - at < CACHE_SECS
+
+async def _sync_index(records: AsyncIterator[Dict[str, Any]]) -> None:
+    """
+    Kalıcı indeksi Kea'nın güncel tablosuna eşitler; ilk yüklemeden sonra
+    farklar değişiklik akışına yazılır. Sayfalama yarıda kesilirse düşürme yapılmaz.
+    """
+    emit = bool(_meta)
+    seen = set()
+    async for rec in records:
+        seen.add(rec["ip"])
+        _index.put(rec, emit)
+    _index.drop_missing(seen, emit)
+    _index.expire_due(emit=emit)
+
+async def _refresh() -> None:
+    """
+    CACHE_SECS dolduysa Kea'dan tabloyu sayfa sayfa çekip indeksi eşitler.
+    Eşzamanlı istekler aynı yenilemeyi bekler.
+    """
+    global _meta, _fetched_at
+    async with _lock:
+        if _meta and _fresh(_fetched_at):
+            return
+        await _sync_index(_normalize_pages(kea_client.iter_lease_pages(KEA_HTTP_URL)))
+        _meta, _fetched_at = _meta_now(result=0, text=f"{len(_index)} IPv4 lease(s) found."), time.monotonic()
+
+async def _resolve_subnet(value: str) -> int:
+    """
+    subnet_id (ör. "3") veya subnet CIDR'ı (ör. "10.0.0.0/24") -> Kea subnet id.
+    Kea config'i okunabiliyorsa yalnızca tanımlı subnet'ler kabul edilir.
+    """
+    pools = await kea_pools.pools_from_agent(KEA_HTTP_URL)
+    value = value.strip()
+    if value.isdigit():
+        sid = int(value)
+        if pools and str(sid) not in pools:
+            raise HTTPException(status_code=400, detail=f"Tanımlı olmayan subnet_id: {value}")
+        return sid
 
     try:
-        with httpx.Client(timeout=3.0) as c:
-            r = c.post(KEA_HTTP_URL, json=payload)
-            r.raise_for_status()
-            resp_json = r.json()
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Kea HTTP call failed: {e}")
-
-    return _normalize_kea(resp_json)
+        net = ipaddress.ip_network(value, strict=False)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Geçersiz subnet_id: {value}")
+    for sid, p in pools.items():
+        try:
+            if p.get("subnet") and ipaddress.ip_network(p["subnet"], strict=False) == net:
+                return int(sid)
+        except ValueError:
+            continue
+    raise HTTPException(status_code=400, detail=f"Tanımlı olmayan subnet: {net}")
+
+async def _subnet_index(sid: int) -> Tuple[lease_index.LeaseIndex, Dict[str, Any]]:
+    """
+    Tam tablo cache'i tazeyse onu, değilse sadece bu subnet'in lease'lerini çeker.
+    """
+    if _meta and _fresh(_fetched_at):
+        return _index, _meta
+
+    cached = _subnet_cache.get(sid)
+    if cached and _fresh(cached[2]):
+        _subnet_cache.move_to_end(sid)
+        return cached[0], cached[1]
+
+    leases = await kea_client.leases_for_subnets(KEA_HTTP_URL, [sid])
+    ix = lease_index.LeaseIndex()
+    for l in leases:
+        ix.put(_normalize_lease(l))
+    meta = _meta_now(subnets=[sid])
+    _subnet_cache[sid] = (ix, meta, time.monotonic())
+    _subnet_cache.move_to_end(sid)
+    while len(_subnet_cache) > SUBNET_CACHE_MAX:
+        _subnet_cache.popitem(last=False)
+    return ix, meta
+
+@router.get("/leases", summary="Kea HTTP endpoint (POST) -> normalize leases")
+async def leases_from_kea_http(
+    request: Request,
+    subnet_id: Optional[str] = Query(None, description="Kea subnet id veya subnet CIDR'ı"),
+    state: Optional[int] = None,
+    mac: Optional[str] = Query(None, description="MAC öneki"),
+    hostname: Optional[str] = Query(None, description="Hostname öneki"),
+    cidr: Optional[str] = Query(None, description="Ör. 10.0.0.0/24"),
+    expiring_within: Optional[int] = Query(None, ge=0, description="N saniye içinde bitenler"),
+    sort: str = Query("ip", description="ip, mac, hostname, subnet_id, state, expire, remaining_secs; azalan için '-' öneki"),
+    page: int = Query(1, ge=1),
+    limit: Optional[int] = Query(None, ge=1, le=lease_index.MAX_LIMIT),
+    format: str = Query("json", description="json veya ndjson (satır başına bir lease)"),
+):
+    if subnet_id is not None:
+        sid = await _resolve_subnet(subnet_id)
+        subnet_id = str(sid)
+        ix, meta = await _subnet_index(sid)
+    else:
+        await _refresh()
+        ix, meta = _index, _meta
+
+    # Subnet cache'leri her çekişte yeni indekstir; zamanı da etikete girer
+    etag = lease_index.etag(
+        ix, "kea", None if ix is _index else meta.get("mtime"),
+        subnet_id=subnet_id, state=state, mac=mac, hostname=hostname, cidr=cidr,
+        expiring_within=expiring_within, sort=sort, page=page, limit=limit, format=format,
+    )
+    if conditional.not_modified(request, etag):
+        return conditional.not_modified_response(etag)
+
+    res = lease_index.query(
+        ix, subnet_id=subnet_id, state=state, mac=mac, hostname=hostname, cidr=cidr,
+        expiring_within=expiring_within, sort=sort, page=page, limit=limit,
+    )
+
+    head = {
+        "count": res["count"],
+        "page": res["page"],
+        "limit": res["limit"],
+        "pages": res["pages"],
+        "meta": dict(meta),
+    }
+    return conditional.stream_response(request, etag, head, "items", res["items"], format)
+
+@router.get("/leases/stats", summary="Subnet bazlı lease / pool kullanım sayaçları")
+async def lease_stats(expiring_within: int = Query(3600, ge=0, description="expiring_soon penceresi (sn)")):
+    await _refresh()
+    res = lease_index.stats(_index, await kea_pools.pools_from_agent(KEA_HTTP_URL), expiring_within)
+    res["meta"] = dict(_meta)
+    return res
+
+@router.get("/leases/changes", summary="Lease değişiklikleri (add/renew/release/expire)")
+async def lease_changes(since: int = Query(0, ge=0, description="Son görülen seq")):
+    await _refresh()
+    return _feed.since(since)
+
+@router.get("/leases/stream", summary="Lease değişiklikleri (SSE)")
+async def lease_changes_stream(since: Optional[int] = Query(None, ge=0, description="Son görülen seq")):
+    # İlk yenileme hatası cevap başlamadan HTTP hatası olarak döner
+    await _refresh()
+    return StreamingResponse(lease_events.event_stream(_feed, _refresh, since), media_type="text/event-stream")
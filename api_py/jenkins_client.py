@@ -0,0 +1,170 @@
+"""
+Jenkins için uzun ömürlü async client.
+
+- Tek, havuzlu httpx.AsyncClient (keep-alive).
+- Çalışan kullanıcı/token bir kez bulunur ve 401/403 alınana kadar
+  tekrar kullanılır (her istekte failover döngüsü çalışmaz).
+- `AdaptiveLimit`: eşzamanlı istek sınırı AIMD ile ayarlanır; hızlı
+  cevaplarda yavaşça artar, 429/503 veya yavaş cevapta azalır.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException
+
+JENKINS_TIMEOUT = 10.0
+
+# Eşzamanlılık sınırları (AIMD)
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 16
+START_CONCURRENCY = 5
+SLOW_RESPONSE_SECS = 2.0   # bunun üstü "yavaş" sayılır
+BACKOFF_STATUSES = (429, 503)
+MAX_RETRIES = 2
+
+_client: Optional[httpx.AsyncClient] = None
+_auth: Optional[Tuple[str, str]] = None
+_auth_known = False
+
+
+def client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=JENKINS_TIMEOUT,
+            headers={"Accept": "application/json"},
+            limits=httpx.Limits(max_connections=MAX_CONCURRENCY, max_keepalive_connections=MAX_CONCURRENCY),
+        )
+    return _client
+
+
+async def close() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def base_url() -> str:
+    url = os.getenv("JENKINS_URL", "http://localhost:8080").rstrip("/")
+    if not url:
+        raise HTTPException(status_code=503, detail="JENKINS_URL ortam değişkeni bulunamadı.")
+    return url
+
+
+# .env'den kullanıcı/token çiftlerini listeye çevirir
+def _get_auth_combinations() -> List[Tuple[str, str]]:
+    users = os.getenv("JENKINS_USERS", "").split(",")
+    tokens = os.getenv("JENKINS_TOKENS", "").split(",")
+    
+    # Eski tip tekil tanımlama varsa onu da destekle (Backward compatibility)
+    if not users or users == ['']:
+        single_user = os.getenv("JENKINS_USER")
+        single_token = os.getenv("JENKINS_TOKEN") or os.getenv("JENKINS_PASSWORD")
+        if single_user and single_token:
+            return [(single_user, single_token)]
+        return []
+
+    # Listeleri temizle ve eşleştir
+    clean_users = [u.strip() for u in users if u.strip()]
+    clean_tokens = [t.strip() for t in tokens if t.strip()]
+    
+    # Zip ile eşleştir (User1-Token1, User2-Token2...)
+    return list(zip(clean_users, clean_tokens))
+
+
+class AdaptiveLimit:
+    """
+    Eşzamanlı istek sınırı: başarılı ve hızlı her cevapta +1/limit (tur başına
+    ~+1), 429/503'te yarıya, yavaş cevapta %20 düşer.
+    """
+
+    def __init__(self, start: float = START_CONCURRENCY):
+        self.limit = float(start)
+        self.active = 0
+        self._cond = asyncio.Condition()
+
+    async def __aenter__(self) -> "AdaptiveLimit":
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.active < int(self.limit))
+            self.active += 1
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        async with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    def record(self, status: Optional[int], elapsed: float) -> None:
+        if status in BACKOFF_STATUSES:
+            self.limit = max(MIN_CONCURRENCY, self.limit / 2)
+        elif elapsed > SLOW_RESPONSE_SECS:
+            self.limit = max(MIN_CONCURRENCY, self.limit * 0.8)
+        elif status is not None and status < 400:
+            self.limit = min(MAX_CONCURRENCY, self.limit + 1 / self.limit)
+
+
+limiter = AdaptiveLimit()
+
+
+def _retry_after(resp: httpx.Response, attempt: int) -> float:
+    try:
+        return min(float(resp.headers.get("Retry-After", "")), 30.0)
+    except ValueError:
+        return 0.5 * (2 ** attempt)
+
+
+async def _send(url: str, params: Dict[str, Any], auth: Any) -> httpx.Response:
+    """
+    Limiter altında tek GET; 429/503'te Retry-After kadar bekleyip tekrar dener.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        async with limiter:
+            t0 = time.monotonic()
+            try:
+                resp = await client().get(url, params=params, auth=auth)
+            except httpx.HTTPError:
+                limiter.record(None, time.monotonic() - t0)
+                raise
+            limiter.record(resp.status_code, time.monotonic() - t0)
+        if resp.status_code not in BACKOFF_STATUSES or attempt == MAX_RETRIES:
+            return resp
+        await asyncio.sleep(_retry_after(resp, attempt))
+    return resp
+
+
+async def get_json(url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Hatırlanan auth ile GET; 401/403 alınırsa tanımlı kullanıcıları sırayla
+    dener ve çalışanı hatırlar. Hata olursa httpx.HTTPError fırlatır.
+    """
+    global _auth, _auth_known
+    params = params or {}
+
+    if _auth_known:
+        resp = await _send(url, params, _auth)
+        if resp.status_code not in (401, 403):
+            resp.raise_for_status()
+            return resp.json()
+        _auth_known = False
+
+    combos: List[Any] = _get_auth_combinations() or [None]
+    # Son çalışan (artık reddedilen) auth en sona
+    if _auth in combos:
+        combos.remove(_auth)
+        combos.append(_auth)
+
+    resp = None
+    for auth in combos:
+        resp = await _send(url, params, auth)
+        if resp.status_code in (401, 403):
+            continue # Yetki hatasıysa bir sonraki kullanıcıyı dene
+        resp.raise_for_status()
+        _auth, _auth_known = auth, True
+        return resp.json()
+    resp.raise_for_status()
+    return {}
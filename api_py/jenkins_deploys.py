@@ -1,13 +1,16 @@
 import asyncio
 import os
 import re
+import time
 from datetime import date, timedelta, datetime
 
-from typing import Any, Dict, List, Optional, Tuple 
+from typing import Any, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 import httpx
 from fastapi import APIRouter, HTTPException, Query
 
+from . import jenkins_client
+
 # .env yükle
 load_dotenv()
 
@@ -26,178 +29,282 @@ def _daterange(days: int) -> List[date]:
     start = today - timedelta(days=days - 1)
     return [start + timedelta(days=offset) for offset in range(days)]
 
-# .env'den kullanıcı/token çiftlerini listeye çevirir
-def _get_auth_combinations() -> List[Tuple[str, str]]:
-    users = os.getenv("JENKINS_USERS", "").split(",")
-    tokens = os.getenv("JENKINS_TOKENS", "").split(",")
-    
-    # Eski tip tekil tanımlama varsa onu da destekle (Backward compatibility)
-    if not users or users == ['']:
-        single_user = os.getenv("JENKINS_USER")
-        single_token = os.getenv("JENKINS_TOKEN") or os.getenv("JENKINS_PASSWORD")
-        if single_user and single_token:
-            return [(single_user, single_token)]
-        return []
-
-    # Listeleri temizle ve eşleştir
-    clean_users = [u.strip() for u in users if u.strip()]
-    clean_tokens = [t.strip() for t in tokens if t.strip()]
-    
-    # Zip ile eşleştir (User1-Token1, User2-Token2...)
-    return list(zip(clean_users, clean_tokens))
+# Deploy istatistikleri bellekte job bazlı günlük sayaçlar olarak tutulur.
+# Her job için görülen en yüksek build numarası saklanır; sonraki turlarda
+# sadece lastBuild ilerlemiş job'ların yeni build'leri çekilir.
+HISTORY_DAYS = 60          # tutulan gün sayısı (days üst sınırı)
+REFRESH_SECS = 60          # cache bu süreden eskiyse arka planda yenilenir
+BACKFILL_BUILDS = 2000     # ilk taramada job başına en fazla build
+# En az bu kadar job güncellenecekse ve hiçbiri bundan fazla build istemiyorsa tek derin sorgu
+DEPTH_QUERY_MIN_JOBS = 4
+DEPTH_QUERY_MAX_BUILDS = 50
+
+class _JobStats:
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.url = url
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Sayaçları sıfırlar (job aynı adla yeniden oluşturulduğunda).
+        """
+        self.last_number = 0
+        # Sayılmış build -> (gün, başarılı mı); tekrar sayılmasın, eski günlerle birlikte silinir
+        self.seen: Dict[int, Tuple[str, bool]] = {}
+        # Henüz bitmemiş (result=None) build numaraları
+        self.pending: set = set()
+        # gün -> [başarılı, toplam]
+        self.daily: Dict[str, List[int]] = {}
+        self.error = False
+
+    def fetch_count(self, last_build: int) -> int:
+        """
+        Yeni build'leri (ve bitmemişleri) kapsayan en yeni build sayısı; 0 ise istek gerekmez.
+        """
+        if last_build <= 0:
+            return 0
+        if last_build < self.last_number:
+            # Job silinip aynı adla yeniden oluşturulmuş: baştan say
+            self.reset()
+        if self.last_number == 0:
+            return BACKFILL_BUILDS
+        oldest = min(self.pending) if self.pending else self.last_number + 1
+        if last_build < oldest:
+            return 0
+        return min(last_build - oldest + 1, BACKFILL_BUILDS)
+
+    def apply(self, builds: List[Dict[str, Any]], min_day: str) -> None:
+        # Çekilen aralık tüm bekleyenleri kapsar; listede olmayanlar silinmiştir
+        self.pending &= {b.get("number") for b in builds}
+        for b in builds:
+            num = b.get("number")
+            ts = b.get("timestamp")
+            if not isinstance(num, int) or num in self.seen or ts is None:
+                continue
+            self.last_number = max(self.last_number, num)
+            result = b.get("result")
+            if result is None:
+                self.pending.add(num)
+                continue
+            self.pending.discard(num)
+            key = date.fromtimestamp(ts / 1000).isoformat()
+            self.seen[num] = (key, result == "SUCCESS")
+            if key < min_day:
+                continue
+            counts = self.daily.setdefault(key, [0, 0])
+            counts[0] += result == "SUCCESS"
+            counts[1] += 1
+
+    def prune(self, min_day: str) -> None:
+        for key in [k for k in self.daily if k < min_day]:
+            del self.daily[key]
+        for num in [n for n, (k, _) in self.seen.items() if k < min_day]:
+            del self.seen[num]
+
+    def counts(self, max_builds: int, success_only: bool) -> Dict[str, int]:
+        """
+        gün -> build sayısı; sadece job'ın en yeni max_builds bitmiş build'i sayılır.
+        """
+        if max_builds >= len(self.seen):
+            col = 0 if success_only else 1
+            return {key: c[col] for key, c in self.daily.items()}
+        out: Dict[str, int] = {}
+        for num in sorted(self.seen, reverse=True)[:max_builds]:
+            key, ok = self.seen[num]
+            if ok or not success_only:
+                out[key] = out.get(key, 0) + 1
+        return out
+
+
+class DeployStore:
+    def __init__(self):
+        self.jobs: Dict[str, _JobStats] = {}
+        self.refreshed_at: Optional[datetime] = None
+        self.error: Optional[str] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._loop_task: Optional["asyncio.Task[None]"] = None
+        self._last = 0.0
+
+    async def _fetch_jobs(self) -> List[Dict[str, Any]]:
+        """
+        Job listesi + her job'ın lastBuild numarası (tek istek).
+        """
+        try:
+            data = await jenkins_client.get_json(
+                f"{jenkins_client.base_url()}/api/json",
+                {"tree": "jobs[name,url,lastBuild[number]]"},
+            )
+        except httpx.HTTPStatusError as exc:
+            if exc.response.status_code in [401, 403]:
+                raise HTTPException(status_code=502, detail="Tanımlı hiçbir kullanıcı ile giriş yapılamadı (401/403).")
+            raise HTTPException(status_code=502, detail=f"Jenkins'e erişilemedi. Hata: {str(exc)}")
+        except httpx.HTTPError as exc:
+            raise HTTPException(status_code=502, detail=f"Jenkins'e erişilemedi. Hata: {str(exc)}")
+        return data.get("jobs", [])
+
+    async def _fetch_depth(self, needed: Dict[str, int]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Tüm job'ların son n build'i tek `jobs[name,builds[...]{0,n}]` sorgusuyla.
+        """
+        n = max(needed.values())
+        data = await jenkins_client.get_json(
+            f"{jenkins_client.base_url()}/api/json",
+            {"tree": f"jobs[name,builds[number,timestamp,result]{{0,{n}}}]"},
+        )
+        return {j.get("name"): j.get("builds") or [] for j in data.get("jobs", []) if j.get("name") in needed}
+
+    async def _fetch_job(self, st: _JobStats, n: int) -> Optional[List[Dict[str, Any]]]:
+        # Build'ler yeniden eskiye; {0,n} sadece en yeni n tanesi
+        try:
+            data = await jenkins_client.get_json(
+                f"{st.url.rstrip('/')}/api/json",
+                {"tree": f"builds[number,timestamp,result]{{0,{n}}}"},
+            )
+        except httpx.HTTPError:
+            return None
+        return data.get("builds", [])
+
+    async def refresh(self) -> None:
+        min_day = _daterange(HISTORY_DAYS)[0].isoformat()
+        jobs = await self._fetch_jobs()
+
+        # Hangi job'dan kaç yeni build çekilecek
+        needed: Dict[str, int] = {}
+        for job in jobs:
+            name, url = job.get("name"), job.get("url")
+            if not name or not url:
+                continue
+            st = self.jobs.get(name)
+            if st is None:
+                st = self.jobs[name] = _JobStats(name, url)
+            st.error = False
+            n = st.fetch_count((job.get("lastBuild") or {}).get("number") or 0)
+            if n:
+                needed[name] = n
+
+        # Çok job az build istiyorsa N ayrı istek yerine tek derin sorgu
+        results: Dict[str, Optional[List[Dict[str, Any]]]] = {}
+        if len(needed) >= DEPTH_QUERY_MIN_JOBS and max(needed.values()) <= DEPTH_QUERY_MAX_BUILDS:
+            try:
+                results.update(await self._fetch_depth(needed))
+            except httpx.HTTPError:
+                pass
+
+        rest = [name for name in needed if name not in results]
+        fetched = await asyncio.gather(*[self._fetch_job(self.jobs[name], needed[name]) for name in rest])
+        results.update(zip(rest, fetched))
+
+        for name, builds in results.items():
+            st = self.jobs[name]
+            if builds is None:
+                st.error = True
+                continue
+            st.apply(builds, min_day)
+            st.prune(min_day)
+
+        # Silinmiş job'lar
+        names = {job.get("name") for job in jobs}
+        for name in [n for n in self.jobs if n not in names]:
+            del self.jobs[name]
+        self.refreshed_at = datetime.now()
+
+    async def _run_refresh(self) -> None:
+        prev = self.error
+        try:
+            await self.refresh()
+            self.error = None
+        except HTTPException as exc:
+            self.error = exc.detail
+        except Exception as exc:
+            self.error = str(exc)
+        finally:
+            self._last = time.monotonic()
+        if self.error and self.error != prev:
+            print(f"Jenkins deploy istatistikleri yenilenemedi: {self.error}")
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            if self._task is None or self._task.done():
+                self._task = asyncio.create_task(self._run_refresh())
+            await self._task
+            await asyncio.sleep(REFRESH_SECS)
+
+    def start(self) -> None:
+        """
+        Arka planda REFRESH_SECS aralıkla artımlı yenileme (app lifespan'ında).
+        """
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        tasks = [t for t in (self._loop_task, self._task) if t is not None]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop_task = self._task = None
+
+    async def ensure_fresh(self) -> None:
+        """
+        İlk çağrı yüklemeyi bekler; sonrasında cache eskiyse yenileme arka
+        planda başlar ve cevap mevcut sayaçlardan verilir.
+        """
+        if self._task is None or self._task.done():
+            if self.refreshed_at is None or time.monotonic() - self._last >= REFRESH_SECS:
+                self._task = asyncio.create_task(self._run_refresh())
+        if self.refreshed_at is None and self._task is not None:
+            await asyncio.shield(self._task)
+            if self.refreshed_at is None:
+                raise HTTPException(status_code=502, detail=self.error or "Jenkins verisi alınamadı.")
+
+    @property
+    def refreshing(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+
+store = DeployStore()
 
 @router.get("/api/jenkins/deploys")
 async def jenkins_deploys(
-    days: int = Query(7, ge=1, le=60),
-    max_builds: int = Query(200, ge=1, le=2000),
+    days: int = Query(7, ge=1, le=HISTORY_DAYS),
+    max_builds: int = Query(200, ge=1, le=BACKFILL_BUILDS, description="Job başına sayılan en yeni build sayısı"),
     include: Optional[str] = None,
     exclude: Optional[str] = None,
     success_only: bool = True,
 ):
-    # --- 1. Konfigürasyon ve Hazırlık ---
-    base_url = os.getenv("JENKINS_URL", "http://localhost:8080").rstrip("/")
-    
-    if not base_url:
-         raise HTTPException(status_code=503, detail="JENKINS_URL ortam değişkeni bulunamadı.")
-
     include = include or os.getenv("JENKINS_JOB_REGEX")
     include_re = _compile_regex(include, "include")
     exclude_re = _compile_regex(exclude, "exclude")
 
-    date_list = _daterange(days)
-    date_keys = [d.isoformat() for d in date_list]
-    date_set = set(date_keys)
-    
-    # İstatistik containerları
+    await store.ensure_fresh()
+
+    # Sorgu tamamen bellekteki sayaçlardan cevaplanır
+    date_keys = [d.isoformat() for d in _daterange(days)]
     daily_totals = {key: 0 for key in date_keys}
     items: List[Dict[str, Any]] = []
     errors: List[str] = []
-    
-    auth_combinations = _get_auth_combinations()
-    if not auth_combinations:
-        # Auth yoksa anonim dene (None)
-        auth_combinations = [None] 
-
-    headers = {"Accept": "application/json"}
-    
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        
-        # --- 2. Auth Denemesi ve Job Listesi Çekme (Failover Logic) ---
-        jobs = []
-        active_auth = None
-        jobs_fetched = False
-        last_error = None
-
-        # Sırayla tanımlı kullanıcıları dener
-        for auth in auth_combinations:
-            try:
-                jobs_resp = await client.get(
-                    f"{base_url}/api/json",
-                    params={"tree": "jobs[name,url]"},
-                    headers=headers,
-                    auth=auth,
-                )
-                jobs_resp.raise_for_status()
-                payload = jobs_resp.json()
-                jobs = payload.get("jobs", [])
-                active_auth = auth # Çalışan auth bilgisini kaydet
-                jobs_fetched = True
-                break # Başarılı olduysa döngüden çık
-            except httpx.HTTPStatusError as exc:
-                last_error = exc
-                if exc.response.status_code in [401, 403]:
-                    continue # Yetki hatasıysa bir sonraki kullanıcıyı dene
-                else:
-                    break # Başka hataysa (500 vs) döngüyü kır
-            except httpx.HTTPError as exc:
-                last_error = exc
-                break # Bağlantı hatasıysa döngüyü kır
-
-        if not jobs_fetched:
-             detail_msg = f"Jenkins'e erişilemedi. Hata: {str(last_error)}"
-             if isinstance(last_error, httpx.HTTPStatusError) and last_error.response.status_code in [401, 403]:
-                 detail_msg = "Tanımlı hiçbir kullanıcı ile giriş yapılamadı (401/403)."
-             raise HTTPException(status_code=502, detail=detail_msg)
-
-        # --- 3. Job Filtreleme ---
-        filtered_jobs = []
-        for job in jobs:
-            name = job.get("name")
-            if not name: continue
-            if include_re and not include_re.search(name): continue
-            if exclude_re and exclude_re.search(name): continue
-            filtered_jobs.append(job)
-
-        # --- 4. Build Verilerini Çekme (Parallel) ---
-        sem = asyncio.Semaphore(5) 
-
-        async def fetch_builds(job: Dict[str, Any]) -> Dict[str, Any]:
-            job_url = job.get("url")
-            name = job.get("name")
-            if not job_url or not name:
-                return {"name": name or "unknown", "builds": []}
-            
-            tree = f"builds[number,timestamp,result]{{0,{max_builds}}}"
-            async with sem:
-                try:
-                    # Yukarıda belirlediğimiz çalışan 'active_auth' kullanılıyor
-                    resp = await client.get(
-                        f"{job_url.rstrip('/')}/api/json",
-                        params={"tree": tree},
-                        headers=headers,
-                        auth=active_auth, 
-                    )
-                    resp.raise_for_status()
-                    data = resp.json()
-                    return {"name": name, "builds": data.get("builds", [])}
-                except httpx.HTTPError:
-                    return {"name": name, "builds": [], "error": True}
-
-        job_results = await asyncio.gather(*[fetch_builds(job) for job in filtered_jobs])
-
-    # --- 5. Veri İşleme ve İstatistik ---
-    min_date = date_list[0]
-
-    for job in job_results:
-        name = job.get("name")
-        builds = job.get("builds", [])
-        
-        if job.get("error"):
-            errors.append(name)
-            
-        job_daily = {key: 0 for key in date_keys}
-        total = 0
 
-        for build in builds:
-            result = build.get("result")
-            if success_only and result != "SUCCESS":
-                continue
+    for st in store.jobs.values():
+        name = st.name
+        if include_re and not include_re.search(name): continue
+        if exclude_re and exclude_re.search(name): continue
+        if st.error:
+            errors.append(name)
 
-            ts = build.get("timestamp")
-            if ts is None: continue
-            
-            build_date = date.fromtimestamp(ts / 1000)
-            if build_date < min_date: continue
-                
-            key = build_date.isoformat()
-            if key not in date_set: continue
-                
-            job_daily[key] += 1
-            daily_totals[key] += 1
-            total += 1
-
-        items.append(
-            {
-                "name": name,
-                "total": total,
-                "daily": [{"date": key, "count": job_daily[key]} for key in date_keys],
-            }
-        )
+        counts = st.counts(max_builds, success_only)
+        daily = []
+        total = 0
+        for key in date_keys:
+            n = counts.get(key, 0)
+            daily.append({"date": key, "count": n})
+            daily_totals[key] += n
+            total += n
+        items.append({"name": name, "total": total, "daily": daily})
 
     items.sort(key=lambda item: item["total"], reverse=True)
 
     return {
-        "generated_at": datetime.now().isoformat(),
+        "generated_at": (store.refreshed_at or datetime.now()).isoformat(),
         "days": days,
         "total": sum(daily_totals.values()),
         "daily": [{"date": key, "count": daily_totals[key]} for key in date_keys],
@@ -209,4 +316,6 @@ async def jenkins_deploys(
             "max_builds": max_builds,
         },
         "errors": errors,
-    }
\ No newline at end of file
+        "refreshing": store.refreshing,
+        "refresh_error": store.error,
+    }
@@ -0,0 +1,277 @@
+"""
+libsystemd (sd-journal) üzerinden doğrudan journal okuma; journalctl fork'u yok.
+
+- /run/log/journal ve /var/log/journal altındaki journal dosyaları tek handle ile açılır.
+- Tüm unit'ler tek match kümesiyle (_SYSTEMD_UNIT=... veya _PID=1 + UNIT=...)
+  sorgulanır ve sondan geriye tek geçişte her unit için son N kayıt toplanır.
+- Son okunan cursor saklanır; sonraki çağrılar yalnızca yeni kayıtları okur.
+- Kayıtlar cursor'larıyla tutulur; istemci cursor'ından sonraki satırlar `since()` ile alınır.
+
+libsystemd yüklenemezse `available()` False döner ve çağıran taraf journalctl'a düşer.
+"""
+
+import ctypes
+import ctypes.util
+import glob
+import os
+import socket
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+_lib = None
+
+
+def _load():
+    global _lib
+    if _lib is not None:
+        return _lib or None
+    try:
+        lib = ctypes.CDLL(ctypes.util.find_library("systemd") or "libsystemd.so.0")
+    except OSError:
+        _lib = False
+        return None
+
+    vp = ctypes.c_void_p
+    lib.sd_journal_open_files.argtypes = [ctypes.POINTER(vp), ctypes.POINTER(ctypes.c_char_p), ctypes.c_int]
+    lib.sd_journal_close.argtypes = [vp]
+    lib.sd_journal_close.restype = None
+    lib.sd_journal_add_match.argtypes = [vp, ctypes.c_char_p, ctypes.c_size_t]
+    lib.sd_journal_add_disjunction.argtypes = [vp]
+    lib.sd_journal_seek_tail.argtypes = [vp]
+    lib.sd_journal_seek_cursor.argtypes = [vp, ctypes.c_char_p]
+    lib.sd_journal_test_cursor.argtypes = [vp, ctypes.c_char_p]
+    lib.sd_journal_previous.argtypes = [vp]
+    lib.sd_journal_next.argtypes = [vp]
+    lib.sd_journal_get_data.argtypes = [vp, ctypes.c_char_p, ctypes.POINTER(vp), ctypes.POINTER(ctypes.c_size_t)]
+    lib.sd_journal_get_realtime_usec.argtypes = [vp, ctypes.POINTER(ctypes.c_uint64)]
+    lib.sd_journal_get_cursor.argtypes = [vp, ctypes.POINTER(vp)]
+    _lib = lib
+    return lib
+
+
+_libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6")
+_libc.free.argtypes = [ctypes.c_void_p]
+_libc.free.restype = None
+
+
+def available() -> bool:
+    return _load() is not None
+
+
+def journal_files(dirs: Iterable[str]) -> List[str]:
+    files: List[str] = []
+    for d in dirs:
+        for pattern in ("*.journal", "*.journal~", "*/*.journal", "*/*.journal~"):
+            files.extend(glob.glob(os.path.join(d, pattern)))
+    return sorted(set(files))
+
+
+class _Journal:
+    """
+    sd_journal handle'ı için ince sarmalayıcı.
+    """
+
+    def __init__(self, files: List[str]):
+        self.lib = _load()
+        self.j = ctypes.c_void_p()
+        arr = (ctypes.c_char_p * (len(files) + 1))(*[os.fsencode(f) for f in files], None)
+        rc = self.lib.sd_journal_open_files(ctypes.byref(self.j), arr, 0)
+        if rc < 0:
+            raise OSError(-rc, f"sd_journal_open_files: {os.strerror(-rc)}")
+
+    def close(self) -> None:
+        if self.j:
+            self.lib.sd_journal_close(self.j)
+            self.j = ctypes.c_void_p()
+
+    def add_match(self, match: str) -> None:
+        b = match.encode()
+        self.lib.sd_journal_add_match(self.j, b, len(b))
+
+    def add_disjunction(self) -> None:
+        self.lib.sd_journal_add_disjunction(self.j)
+
+    def seek_tail(self) -> None:
+        self.lib.sd_journal_seek_tail(self.j)
+
+    def seek_cursor(self, cursor: str) -> bool:
+        return self.lib.sd_journal_seek_cursor(self.j, cursor.encode()) >= 0
+
+    def test_cursor(self, cursor: str) -> bool:
+        return self.lib.sd_journal_test_cursor(self.j, cursor.encode()) > 0
+
+    def previous(self) -> bool:
+        return self.lib.sd_journal_previous(self.j) > 0
+
+    def next(self) -> bool:
+        return self.lib.sd_journal_next(self.j) > 0
+
+    def get(self, field: str) -> Optional[str]:
+        data = ctypes.c_void_p()
+        length = ctypes.c_size_t()
+        if self.lib.sd_journal_get_data(self.j, field.encode(), ctypes.byref(data), ctypes.byref(length)) < 0:
+            return None
+        raw = ctypes.string_at(data, length.value)
+        return raw.split(b"=", 1)[1].decode("utf-8", errors="replace")
+
+    def realtime(self) -> Optional[float]:
+        usec = ctypes.c_uint64()
+        if self.lib.sd_journal_get_realtime_usec(self.j, ctypes.byref(usec)) < 0:
+            return None
+        return usec.value / 1_000_000
+
+    def cursor(self) -> Optional[str]:
+        p = ctypes.c_void_p()
+        if self.lib.sd_journal_get_cursor(self.j, ctypes.byref(p)) < 0 or not p.value:
+            return None
+        try:
+            return ctypes.string_at(p).decode()
+        finally:
+            _libc.free(p)
+
+
+def _match_units(j: _Journal, units: List[str]) -> None:
+    """
+    journalctl -u benzeri: (_SYSTEMD_UNIT=u1 | u2 ...) | (_PID=1 & (UNIT=u1 | u2 ...))
+    """
+    for u in units:
+        j.add_match(f"_SYSTEMD_UNIT={u}")
+    j.add_disjunction()
+    j.add_match("_PID=1")
+    for u in units:
+        j.add_match(f"UNIT={u}")
+
+
+def _entry_unit(j: _Journal, units: List[str]) -> Optional[str]:
+    u = j.get("_SYSTEMD_UNIT")
+    if u in units:
+        return u
+    u = j.get("UNIT")
+    return u if u in units else None
+
+
+def _format_short(j: _Journal) -> str:
+    """
+    journalctl --output=short biçimi:
+      Mon DD HH:MM:SS host ident[pid]: message
+    """
+    ts = j.realtime()
+    stamp = time.strftime("%b %d %H:%M:%S", time.localtime(ts)) if ts else "-"
+    host = j.get("_HOSTNAME") or socket.gethostname()
+    ident = j.get("SYSLOG_IDENTIFIER") or j.get("_COMM") or "unknown"
+    pid = j.get("_PID")
+    msg = j.get("MESSAGE") or ""
+    return f"{stamp} {host} {ident}{f'[{pid}]' if pid else ''}: {msg}"
+
+
+class JournalTail:
+    """
+    Unit listesi için son kayıtları bellekte tutar, cursor ile artımlı okur.
+    """
+
+    def __init__(self, units: List[str], dirs: Iterable[str]):
+        self.units = list(units)
+        self.dirs = list(dirs)
+        self.capacity = 0
+        self.lines: Dict[str, Deque[Tuple[Optional[str], str]]] = {}
+        self.cursors: Dict[str, Optional[str]] = {}
+        self.last_cursor: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _open(self) -> Optional[_Journal]:
+        files = journal_files(self.dirs)
+        if not files:
+            return None
+        j = _Journal(files)
+        _match_units(j, self.units)
+        return j
+
+    def _full_read(self, j: _Journal, n: int) -> None:
+        collected: Dict[str, List[Tuple[str, Optional[str]]]] = {u: [] for u in self.units}
+        remaining = set(self.units)
+        newest: Optional[str] = None
+
+        j.seek_tail()
+        while remaining and j.previous():
+            if newest is None:
+                newest = j.cursor()
+            u = _entry_unit(j, self.units)
+            if u not in remaining:
+                continue
+            collected[u].append((_format_short(j), j.cursor()))
+            if len(collected[u]) >= n:
+                remaining.discard(u)
+
+        self.capacity = n
+        self.last_cursor = newest
+        for u in self.units:
+            entries = list(reversed(collected[u]))
+            self.lines[u] = deque(((cur, line) for line, cur in entries), maxlen=n)
+            self.cursors[u] = entries[-1][1] if entries else None
+
+    def _read_new(self, j: _Journal) -> None:
+        if not self.last_cursor or not j.seek_cursor(self.last_cursor):
+            return
+        if j.next() and not j.test_cursor(self.last_cursor):
+            # cursor'daki kayıt silinmiş (rotate/vacuum); bulunduğumuz kayıt yeni
+            j.previous()
+        while j.next():
+            cur = j.cursor()
+            self.last_cursor = cur or self.last_cursor
+            u = _entry_unit(j, self.units)
+            if u is None:
+                continue
+            self.lines[u].append((cur, _format_short(j)))
+            self.cursors[u] = cur
+
+    def _refresh(self, n: int) -> bool:
+        """
+        İlk çağrıda (veya n kapasiteyi aşarsa) sondan geriye okur, sonrakilerde
+        sadece yeni kayıtları okur. Journal dosyası yoksa False döner.
+        """
+        j = self._open()
+        if j is None:
+            return False
+        try:
+            if n > self.capacity or self.last_cursor is None:
+                self._full_read(j, n)
+            else:
+                self._read_new(j)
+        finally:
+            j.close()
+        return True
+
+    def tail(self, n: int) -> Dict[str, List[str]]:
+        """
+        Her unit için son n satır.
+        """
+        n = max(int(n), 1)
+        with self._lock:
+            if not self._refresh(n):
+                return {u: [] for u in self.units}
+            return {u: [line for _, line in self.lines[u]][-n:] for u in self.units}
+
+    def since(self, cursors: Dict[str, Optional[str]], n: int) -> Dict[str, Tuple[List[str], Optional[str], bool]]:
+        """
+        Unit başına (satırlar, sonraki cursor, incremental).
+
+        cursor bellekteki pencerede bulunursa sadece ondan sonraki satırlar
+        döner (incremental=True); cursor yoksa veya çok eskiyse son n satır
+        döner (incremental=False, istemci görünümü sıfırlamalı).
+        """
+        n = max(int(n), 1)
+        out: Dict[str, Tuple[List[str], Optional[str], bool]] = {}
+        with self._lock:
+            if not self._refresh(n):
+                return {u: ([], cursors.get(u), False) for u in self.units}
+            for u in self.units:
+                entries = list(self.lines[u])
+                cur = cursors.get(u)
+                pos = next((i for i, (c, _) in enumerate(entries) if c == cur), None) if cur else None
+                if pos is not None:
+                    out[u] = ([line for _, line in entries[pos + 1:]][-n:], self.cursors[u], True)
+                else:
+                    out[u] = ([line for _, line in entries][-n:], self.cursors[u], False)
+        return out
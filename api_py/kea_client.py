@@ -0,0 +1,103 @@
+"""
+Kea control-agent için async client.
+
+- Tek, havuzlu httpx.AsyncClient (keep-alive).
+- `iter_lease_pages()`: lease4-get-page ile lease'leri parça parça çeker;
+  tüm veritabanı tek cevapta/tek listede tutulmaz.
+- `leases_for_subnets()`: lease4-get-all + "subnets" ile sadece istenen subnet'ler.
+
+Kea cevap kodları: 0 = başarılı, 2 = komut desteklenmiyor, 3 = boş sonuç.
+"""
+
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+import httpx
+from fastapi import HTTPException
+
+KEA_TIMEOUT = 3.0
+PAGE_LIMIT = 1000
+
+RESULT_SUCCESS = 0
+RESULT_UNSUPPORTED = 2
+RESULT_EMPTY = 3
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=KEA_TIMEOUT,
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=2),
+        )
+    return _client
+
+
+async def close() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def command(url: str, cmd: str, arguments: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Tek komut çalıştırır, dhcp4 servisinin cevabını (liste[0]) döner.
+    """
+    payload: Dict[str, Any] = {"command": cmd, "service": ["dhcp4"]}
+    if arguments is not None:
+        payload["arguments"] = arguments
+    try:
+        r = await client().post(url, json=payload)
+        r.raise_for_status()
+        resp_json = r.json()
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Kea HTTP call failed: {e}")
+
+    if not isinstance(resp_json, list) or not resp_json:
+        raise HTTPException(502, "Kea response beklenen JSON list formatında değil")
+    return resp_json[0]
+
+
+def _leases(resp: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return (resp.get("arguments") or {}).get("leases") or []
+
+
+async def iter_lease_pages(url: str, limit: int = PAGE_LIMIT) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    lease4-get-page ile sayfa sayfa lease listesi. lease_cmds bu komutu
+    desteklemiyorsa tek lease4-get-all cevabına düşer.
+    """
+    cursor = "start"
+    while True:
+        resp = await command(url, "lease4-get-page", {"from": cursor, "limit": limit})
+        result = resp.get("result")
+
+        if result == RESULT_UNSUPPORTED:
+            resp = await command(url, "lease4-get-all")
+            if resp.get("result") not in (RESULT_SUCCESS, RESULT_EMPTY):
+                raise HTTPException(502, f"Kea lease4-get-all hatası: {resp.get('text')}")
+            yield _leases(resp)
+            return
+        if result == RESULT_EMPTY:
+            return
+        if result != RESULT_SUCCESS:
+            raise HTTPException(502, f"Kea lease4-get-page hatası: {resp.get('text')}")
+
+        page = _leases(resp)
+        if not page:
+            return
+        yield page
+        if len(page) < limit:
+            return
+        cursor = page[-1].get("ip-address")
+        if not cursor:
+            return
+
+
+async def leases_for_subnets(url: str, subnet_ids: Iterable[int]) -> List[Dict[str, Any]]:
+    resp = await command(url, "lease4-get-all", {"subnets": [int(s) for s in subnet_ids]})
+    if resp.get("result") not in (RESULT_SUCCESS, RESULT_EMPTY):
+        raise HTTPException(502, f"Kea lease4-get-all hatası: {resp.get('text')}")
+    return _leases(resp)
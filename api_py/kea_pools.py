@@ -0,0 +1,133 @@
+"""
+Kea DHCPv4 subnet/pool boyutları.
+
+Lease istatistiklerinde (kullanım oranı, boş adres) payda olarak kullanılır.
+Kaynak:
+  - HTTP modu: control-agent `config-get` (config-hash-get ile değişmediyse tekrar çekilmez)
+  - CSV modu / fallback: yerel kea-dhcp4.conf (mtime değişince yeniden okunur)
+"""
+
+import ipaddress
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from . import kea_client
+
+KEA_DHCP4_CONF = Path(os.getenv("KEA_DHCP4_CONF", "/etc/kea/kea-dhcp4.conf"))
+
+# Control-agent config'i en fazla bu aralıkla kontrol edilir (sn)
+AGENT_TTL = 60
+
+# subnet_id (str) -> {"subnet": "10.0.0.0/24", "pool_size": 200}
+Pools = Dict[str, Dict[str, Any]]
+
+
+def _pool_size(pool: str) -> int:
+    pool = pool.strip()
+    if "-" in pool:
+        lo, hi = (p.strip() for p in pool.split("-", 1))
+        return int(ipaddress.IPv4Address(hi)) - int(ipaddress.IPv4Address(lo)) + 1
+    return ipaddress.IPv4Network(pool, strict=False).num_addresses
+
+
+def parse_pools(dhcp4: Dict[str, Any]) -> Pools:
+    """
+    Dhcp4 config'inden (shared-networks dahil) subnet bazlı pool toplamları.
+    """
+    subnets = list(dhcp4.get("subnet4") or [])
+    for net in dhcp4.get("shared-networks") or []:
+        subnets.extend(net.get("subnet4") or [])
+
+    out: Pools = {}
+    for s in subnets:
+        if s.get("id") is None:
+            continue
+        size = 0
+        for p in s.get("pools") or []:
+            try:
+                size += _pool_size(p.get("pool") or "")
+            except ValueError:
+                continue
+        out[str(s["id"])] = {"subnet": s.get("subnet"), "pool_size": size}
+    return out
+
+
+def _strip_comments(text: str) -> str:
+    """
+    Kea config'i JSON + (#, //, /* */) yorumlarıdır; string içine dokunmadan yorumları atar.
+    """
+    out = []
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if c == '"':
+            j = i + 1
+            while j < n and text[j] != '"':
+                j += 2 if text[j] == "\\" else 1
+            out.append(text[i:j + 1])
+            i = j + 1
+        elif c == "#" or text.startswith("//", i):
+            j = text.find("\n", i)
+            i = n if j < 0 else j
+        elif text.startswith("/*", i):
+            j = text.find("*/", i + 2)
+            i = n if j < 0 else j + 2
+        else:
+            out.append(c)
+            i += 1
+    return "".join(out)
+
+
+_file_cache: Tuple[float, Pools] = (0.0, {})
+
+
+def pools_from_file(path: Path = KEA_DHCP4_CONF) -> Pools:
+    global _file_cache
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return {}
+    if mtime == _file_cache[0]:
+        return _file_cache[1]
+    try:
+        cfg = json.loads(_strip_comments(path.read_text(encoding="utf-8", errors="ignore")))
+        pools = parse_pools(cfg.get("Dhcp4") or {})
+    except (ValueError, AttributeError):
+        pools = {}
+    _file_cache = (mtime, pools)
+    return pools
+
+
+_agent_cache: Dict[str, Any] = {"hash": None, "pools": None, "checked": 0.0}
+
+
+async def _agent_hash(url: str) -> Optional[str]:
+    resp = await kea_client.command(url, "config-hash-get")
+    if resp.get("result") != kea_client.RESULT_SUCCESS:
+        return None
+    return (resp.get("arguments") or {}).get("hash")
+
+
+async def pools_from_agent(url: str) -> Pools:
+    """
+    control-agent üzerinden pool boyutları; agent erişilemezse yerel dosya.
+    """
+    c = _agent_cache
+    if time.monotonic() - c["checked"] < AGENT_TTL:
+        return c["pools"] if c["pools"] is not None else pools_from_file()
+    c["checked"] = time.monotonic()
+    try:
+        h = await _agent_hash(url)
+        if c["pools"] is None or h is None or h != c["hash"]:
+            resp = await kea_client.command(url, "config-get")
+            if resp.get("result") == kea_client.RESULT_SUCCESS:
+                args = resp.get("arguments") or {}
+                c["pools"] = parse_pools(args.get("Dhcp4") or {})
+                c["hash"] = h or args.get("hash")
+    except Exception:
+        # Agent yoksa bir önceki sonuç (o da yoksa dosya) kullanılır
+        pass
+    return c["pools"] if c["pools"] is not None else pools_from_file()
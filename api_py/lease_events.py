@@ -0,0 +1,120 @@
+"""
+Lease değişiklik akışı (add / renew / release / expire).
+
+Lease indeksleri (lease_index.LeaseIndex) reload sırasında önceki durumla
+farkı buraya yayınlar. İstemciler:
+  - `since(seq)` ile son gördükleri sıra numarasından sonraki event'leri,
+  - `subscribe()` ile SSE üzerinden canlı event'leri alır.
+Geçmiş sınırlı bir halkada tutulur; istemci çok gerideyse `reset` döner ve
+tam listeyi yeniden çekmesi gerekir.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
+
+import httpx
+from fastapi import HTTPException
+
+from .log_hub import Subscription
+
+# Hafızada tutulacak azami event
+HISTORY = 5000
+
+# SSE akışında kaynağın yeniden kontrol aralığı (sn)
+POLL_SECS = 2.0
+
+EVENT_FIELDS = ("ip", "mac", "hostname", "subnet_id", "state", "expire")
+
+
+class LeaseFeed:
+    def __init__(self, history: int = HISTORY):
+        self.seq = 0
+        self._events: deque = deque(maxlen=history)
+        # Abone -> event loop'u (publish CSV modunda thread'den çağrılır)
+        self._subs: Dict[Subscription, asyncio.AbstractEventLoop] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, kind: str, rec: Dict[str, Any]) -> None:
+        with self._lock:
+            self.seq += 1
+            ev = {"seq": self.seq, "ts": int(time.time()), "type": kind}
+            ev.update({k: rec.get(k) for k in EVENT_FIELDS})
+            self._events.append(ev)
+            subs = list(self._subs.items())
+        for sub, loop in subs:
+            loop.call_soon_threadsafe(sub.put, [ev])
+
+    def since(self, seq: int) -> Dict[str, Any]:
+        """
+        seq'den sonraki event'ler. Halkadan düşmüş event varsa reset=True.
+        """
+        with self._lock:
+            oldest = self._events[0]["seq"] if self._events else self.seq + 1
+            reset = seq < oldest - 1 or seq > self.seq
+            events: List[Dict[str, Any]] = [e for e in self._events if e["seq"] > seq]
+            return {"events": events, "next": self.seq, "reset": reset}
+
+    @contextmanager
+    def subscribe(self) -> Iterator[Subscription]:
+        sub = Subscription(HISTORY)
+        with self._lock:
+            self._subs[sub] = asyncio.get_running_loop()
+        try:
+            yield sub
+        finally:
+            with self._lock:
+                self._subs.pop(sub, None)
+
+
+def _sse(ev: Dict[str, Any]) -> str:
+    return f"id: {ev['seq']}\ndata: {json.dumps(ev)}\n\n"
+
+
+async def event_stream(
+    feed: LeaseFeed,
+    refresh: Callable[[], Awaitable[Any]],
+    since: Optional[int] = None,
+) -> AsyncIterator[str]:
+    """
+    SSE: önce since'ten sonraki geçmiş, sonra canlı event'ler. Akış açıkken
+    kaynak POLL_SECS aralıkla yenilenir; yeni diff'ler aboneye düşer.
+
+    İlk yenileme çağıran endpoint'te (cevap başlamadan) yapılır; akış
+    sırasındaki hatalarda bağlantı kapanmaz, bir kez `error` mesajı gönderilir.
+    """
+    error: Optional[str] = None
+    with feed.subscribe() as sub:
+        if since is not None:
+            hist = feed.since(since)
+            if hist["reset"]:
+                yield f"data: {json.dumps({'type': 'reset', 'next': hist['next']})}\n\n"
+            for ev in hist["events"]:
+                yield _sse(ev)
+            # Geçmişte gönderilenler abone kuyruğunda tekrar edilmesin
+            last = hist["next"]
+        else:
+            last = feed.seq
+
+        while True:
+            try:
+                batch = await asyncio.wait_for(sub.get(), timeout=POLL_SECS)
+            except asyncio.TimeoutError:
+                try:
+                    await refresh()
+                    error = None
+                except (HTTPException, httpx.HTTPError, OSError) as e:
+                    detail = getattr(e, "detail", None) or str(e)
+                    if detail != error:
+                        error = detail
+                        yield f"data: {json.dumps({'type': 'error', 'detail': detail})}\n\n"
+                yield ": keepalive\n\n"
+                continue
+            for ev in batch:
+                if ev["seq"] > last:
+                    last = ev["seq"]
+                    yield _sse(ev)
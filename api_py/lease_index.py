@@ -0,0 +1,373 @@
+"""
+Lease kayıtları için in-memory indeks ve sorgu katmanı.
+
+Hem CSV (leases.py) hem Kea HTTP (ip_leases_mod.py) modunda kullanılır.
+IP birincil anahtardır; MAC, hostname ve subnet için ikincil indeksler
+tutulur. MAC/hostname önek aramaları sıralı anahtar listesi üzerinde
+bisect ile yapılır, CIDR aralığı IP'nin sayısal değeri üzerinden bulunur.
+Böylece tek istemci sorgusu tüm tabloyu taramaz/serileştirmez.
+
+İndekse bir LeaseFeed bağlanırsa, `emit=True` ile yapılan değişiklikler
+add / renew / release / expire event'i olarak yayınlanır.
+"""
+
+import heapq
+import ipaddress
+import time
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+
+from .conditional import BOOT_ID, make_etag
+from .lease_events import LeaseFeed
+
+# Kea lease state: 0 default, 1 declined, 2 expired-reclaimed
+STATE_DECLINED = 1
+STATE_EXPIRED_RECLAIMED = 2
+
+SORT_KEYS = ("ip", "mac", "hostname", "subnet_id", "state", "expire", "remaining_secs")
+MAX_LIMIT = 5000
+
+# Sıralamada sona düşen geçersiz IP değeri
+_BAD_IP = 1 << 40
+
+
+def ip_int(ip: str) -> int:
+    try:
+        return int(ipaddress.IPv4Address(ip))
+    except (ipaddress.AddressValueError, ValueError):
+        return _BAD_IP
+
+
+def _add(ix: Dict[str, Set[str]], key: str, ip: str) -> None:
+    if key:
+        ix.setdefault(key, set()).add(ip)
+
+
+def _remove(ix: Dict[str, Set[str]], key: str, ip: str) -> None:
+    s = ix.get(key)
+    if s is not None:
+        s.discard(ip)
+        if not s:
+            del ix[key]
+
+
+def _prefix_range(keys: List[str], prefix: str) -> List[str]:
+    lo = bisect_left(keys, prefix)
+    hi = bisect_right(keys, prefix + "\uffff")
+    return keys[lo:hi]
+
+
+def _change_kind(old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> Optional[str]:
+    if old is None or (old.get("mac") or "") != (new.get("mac") or ""):
+        return "add"
+    if new.get("state") == STATE_EXPIRED_RECLAIMED and old.get("state") != STATE_EXPIRED_RECLAIMED:
+        return "expire"
+    if (new.get("expire") or 0) > (old.get("expire") or 0):
+        return "renew"
+    return None
+
+
+class LeaseIndex:
+    def __init__(self, feed: Optional[LeaseFeed] = None):
+        self.feed = feed
+        self.version = 0
+        # (expire, ip): süresi dolan lease'ler için expire event'i
+        self._expiry: List[Tuple[int, str]] = []
+        # Subnet sayaçları (put/drop ile artımlı güncellenir):
+        #   _subnet_states: subnet -> state -> adet
+        #   _subnet_expires: subnet -> aktif lease'lerin sıralı expire listesi
+        self._subnet_states: Dict[str, Dict[int, int]] = {}
+        self._subnet_expires: Dict[str, List[int]] = {}
+        self.by_ip: Dict[str, Dict[str, Any]] = {}
+        self.by_mac: Dict[str, Set[str]] = {}
+        self.by_host: Dict[str, Set[str]] = {}
+        self.by_subnet: Dict[str, Set[str]] = {}
+        # Tembel kurulan sıralı görünümler (değişiklikte sıfırlanır)
+        self._ip_sorted: Optional[List[Tuple[int, str]]] = None
+        self._mac_keys: Optional[List[str]] = None
+        self._host_keys: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self.by_ip)
+
+    def _dirty(self) -> None:
+        # ETag için: içerik her değiştiğinde artar
+        self.version += 1
+        self._ip_sorted = None
+        self._mac_keys = None
+        self._host_keys = None
+
+    def put(self, rec: Dict[str, Any], emit: bool = False) -> None:
+        ip = rec["ip"]
+        old = self.by_ip.get(ip)
+        if old == rec:
+            return
+        if old is not None:
+            self._unindex(old)
+        self.by_ip[ip] = rec
+        _add(self.by_mac, (rec.get("mac") or "").lower(), ip)
+        _add(self.by_host, (rec.get("hostname") or "").lower(), ip)
+        _add(self.by_subnet, str(rec.get("subnet_id") or ""), ip)
+        self._count(rec, 1)
+        exp = rec.get("expire")
+        if isinstance(exp, int) and self.feed is not None:
+            heapq.heappush(self._expiry, (exp, ip))
+        self._dirty()
+
+        if emit and self.feed is not None:
+            kind = _change_kind(old, rec)
+            if kind:
+                self.feed.publish(kind, rec)
+
+    def drop(self, ip: str, emit: bool = False) -> Optional[Dict[str, Any]]:
+        old = self.by_ip.pop(ip, None)
+        if old is not None:
+            self._unindex(old)
+            self._dirty()
+            if emit and self.feed is not None:
+                self.feed.publish("release", old)
+        return old
+
+    def sync(self, recs: Iterable[Dict[str, Any]], emit: bool = False) -> None:
+        """
+        İndeksi verilen tam listeye eşitler (değişmeyen kayıtlara dokunmaz,
+        listede olmayanları düşürür); farklar event olarak yayınlanabilir.
+        """
+        seen: Set[str] = set()
+        for r in recs:
+            seen.add(r["ip"])
+            self.put(r, emit)
+        self.drop_missing(seen, emit)
+
+    def drop_missing(self, seen: Set[str], emit: bool = False) -> None:
+        for ip in [ip for ip in self.by_ip if ip not in seen]:
+            self.drop(ip, emit)
+
+    def expire_due(self, now: Optional[int] = None, emit: bool = True) -> None:
+        """
+        Süresi dolmuş (henüz reclaim edilmemiş) lease'ler için bir kez expire event'i.
+        """
+        if self.feed is None:
+            return
+        now = int(time.time()) if now is None else now
+        while self._expiry and self._expiry[0][0] <= now:
+            exp, ip = heapq.heappop(self._expiry)
+            rec = self.by_ip.get(ip)
+            if emit and rec is not None and rec.get("expire") == exp and rec.get("state") != STATE_EXPIRED_RECLAIMED:
+                self.feed.publish("expire", rec)
+        # Eskimiş heap girdileri birikmesin
+        if len(self._expiry) > 2 * len(self.by_ip) + 1024:
+            self._expiry = [(r["expire"], ip) for ip, r in self.by_ip.items() if isinstance(r.get("expire"), int)]
+            heapq.heapify(self._expiry)
+
+    def _unindex(self, rec: Dict[str, Any]) -> None:
+        ip = rec["ip"]
+        _remove(self.by_mac, (rec.get("mac") or "").lower(), ip)
+        _remove(self.by_host, (rec.get("hostname") or "").lower(), ip)
+        _remove(self.by_subnet, str(rec.get("subnet_id") or ""), ip)
+        self._count(rec, -1)
+
+    def _count(self, rec: Dict[str, Any], d: int) -> None:
+        sid = str(rec.get("subnet_id") or "")
+        state = rec.get("state")
+        states = self._subnet_states.setdefault(sid, {})
+        states[state] = states.get(state, 0) + d
+        if not states[state]:
+            del states[state]
+            if not states:
+                del self._subnet_states[sid]
+
+        exp = rec.get("expire")
+        if state in (STATE_DECLINED, STATE_EXPIRED_RECLAIMED) or not isinstance(exp, int):
+            return
+        exps = self._subnet_expires.setdefault(sid, [])
+        if d > 0:
+            insort(exps, exp)
+        else:
+            i = bisect_left(exps, exp)
+            if i < len(exps) and exps[i] == exp:
+                del exps[i]
+            if not exps:
+                del self._subnet_expires[sid]
+
+    def subnet_stats(self, now: Optional[int] = None, expiring_within: int = 3600) -> Dict[str, Dict[str, int]]:
+        """
+        Subnet bazlı sayaçlar; maliyet O(subnet · log n), lease'ler taranmaz.
+        in_use: süresi dolmamış aktif lease (declined / reclaimed hariç).
+        """
+        now = int(time.time()) if now is None else now
+        out: Dict[str, Dict[str, int]] = {}
+        for sid, states in self._subnet_states.items():
+            exps = self._subnet_expires.get(sid, [])
+            live = bisect_right(exps, now)
+            out[sid] = {
+                "leases": sum(states.values()),
+                "in_use": len(exps) - live,
+                "expiring_soon": bisect_right(exps, now + expiring_within) - live,
+                "declined": states.get(STATE_DECLINED, 0),
+                "expired_reclaimed": states.get(STATE_EXPIRED_RECLAIMED, 0),
+            }
+        return out
+
+    def ips_sorted(self) -> List[Tuple[int, str]]:
+        if self._ip_sorted is None:
+            self._ip_sorted = sorted((ip_int(ip), ip) for ip in self.by_ip)
+        return self._ip_sorted
+
+    def _candidates(
+        self,
+        subnet_id: Optional[str],
+        mac: Optional[str],
+        hostname: Optional[str],
+        cidr: Optional[ipaddress.IPv4Network],
+    ) -> Optional[Set[str]]:
+        """
+        İndekslerden aday IP kümesi; hiçbir indeksli filtre yoksa None (hepsi).
+        """
+        sets: List[Set[str]] = []
+        if subnet_id is not None:
+            sets.append(self.by_subnet.get(str(subnet_id), set()))
+        if mac:
+            if self._mac_keys is None:
+                self._mac_keys = sorted(self.by_mac)
+            sets.append(set().union(*[self.by_mac[k] for k in _prefix_range(self._mac_keys, mac.lower())]))
+        if hostname:
+            if self._host_keys is None:
+                self._host_keys = sorted(self.by_host)
+            sets.append(set().union(*[self.by_host[k] for k in _prefix_range(self._host_keys, hostname.lower())]))
+        if cidr is not None:
+            ips = self.ips_sorted()
+            lo = bisect_left(ips, (int(cidr.network_address), ""))
+            hi = bisect_right(ips, (int(cidr.broadcast_address), "\uffff"))
+            sets.append({ip for _, ip in ips[lo:hi]})
+        if not sets:
+            return None
+        sets.sort(key=len)
+        result = set(sets[0])
+        for s in sets[1:]:
+            result &= s
+        return result
+
+
+def stats(
+    index: LeaseIndex,
+    pools: Dict[str, Dict[str, Any]],
+    expiring_within: int = 3600,
+) -> Dict[str, Any]:
+    """
+    Subnet sayaçları + pool boyutları (kea_pools). Lease'i olmayan subnet'ler de listelenir.
+    """
+    counts = index.subnet_stats(expiring_within=expiring_within)
+    empty = {"leases": 0, "in_use": 0, "expiring_soon": 0, "declined": 0, "expired_reclaimed": 0}
+
+    items: List[Dict[str, Any]] = []
+    for sid in sorted(set(counts) | set(pools), key=lambda s: (not s.isdigit(), int(s) if s.isdigit() else 0, s)):
+        c = counts.get(sid, empty)
+        pool = pools.get(sid) or {}
+        size = pool.get("pool_size")
+        # Declined adresler de pool'dan düşülür
+        used = c["in_use"] + c["declined"]
+        items.append({
+            "subnet_id": sid,
+            "subnet": pool.get("subnet"),
+            "pool_size": size,
+            **c,
+            "free": max(size - used, 0) if size is not None else None,
+            "utilization": round(100.0 * used / size, 1) if size else None,
+        })
+
+    total = {k: sum(i[k] for i in items) for k in empty}
+    return {"count": len(items), "items": items, "total": total, "expiring_within": expiring_within}
+
+
+def etag(index: LeaseIndex, *source: Any, **params) -> str:
+    """
+    İndeks sürümü + sorgu parametrelerinden zayıf ETag. remaining_secs cevap
+    anına göre hesaplandığı için etiket zayıftır; istemci 304'te kalan süreyi
+    expire'dan kendisi günceller. expiring_within sonucu zamanla değişir,
+    o yüzden bu filtrede saniye de etikete girer.
+    """
+    parts = [*source, BOOT_ID, id(index), index.version, sorted(params.items())]
+    if params.get("expiring_within") is not None:
+        parts.append(int(time.time()))
+    return make_etag(*parts, weak=True)
+
+
+def _sort_value(key: str):
+    if key == "ip":
+        return lambda r: ip_int(r["ip"])
+    if key in ("state", "expire", "remaining_secs"):
+        return lambda r: (r.get(key) is None, r.get(key) or 0)
+    return lambda r: str(r.get(key) or "").lower()
+
+
+def query(
+    index: LeaseIndex,
+    subnet_id: Optional[str] = None,
+    state: Optional[int] = None,
+    mac: Optional[str] = None,
+    hostname: Optional[str] = None,
+    cidr: Optional[str] = None,
+    expiring_within: Optional[int] = None,
+    sort: str = "ip",
+    page: int = 1,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Filtre + sıralama + sayfalama. Dönüş: {"count", "items", "page", "limit", "pages"}
+    (count: filtreye uyan toplam kayıt).
+    """
+    desc = sort.startswith("-")
+    key = sort.lstrip("-")
+    if key not in SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"Geçersiz sort: {sort} ({', '.join(SORT_KEYS)})")
+
+    net = None
+    if cidr:
+        try:
+            net = ipaddress.IPv4Network(cidr, strict=False)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Geçersiz cidr: {e}")
+
+    now = int(time.time())
+    cand = index._candidates(subnet_id, mac, hostname, net)
+
+    # IP sırası için hazır sıralı liste kullanılır
+    if cand is None and key == "ip":
+        recs = [index.by_ip[ip] for _, ip in index.ips_sorted()]
+        presorted = True
+    else:
+        ips = index.by_ip.keys() if cand is None else cand
+        recs = [index.by_ip[ip] for ip in ips if ip in index.by_ip]
+        presorted = False
+
+    items: List[Dict[str, Any]] = []
+    for r in recs:
+        if state is not None and r.get("state") != state:
+            continue
+        exp = r.get("expire")
+        remaining = (exp - now) if (isinstance(exp, int) and exp > now) else 0
+        if expiring_within is not None and not (0 < remaining <= expiring_within):
+            continue
+        item = dict(r)
+        item["remaining_secs"] = remaining
+        items.append(item)
+
+    if not presorted:
+        items.sort(key=_sort_value(key))
+    if desc:
+        items.reverse()
+
+    total = len(items)
+    page = max(int(page), 1)
+    if limit:
+        limit = min(int(limit), MAX_LIMIT)
+        start = (page - 1) * limit
+        items = items[start:start + limit]
+        pages = (total + limit - 1) // limit
+    else:
+        pages = 1
+
+    return {"count": total, "items": items, "page": page, "limit": limit, "pages": pages}
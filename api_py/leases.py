@@ -1,10 +1,18 @@
 # api_py/leases.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pathlib import Path
-import csv, time, os
+from typing import Any, Dict, List, Optional
+import asyncio, csv, io, time, os, threading
+
+from . import lease_index
+from . import lease_events
+from . import kea_pools
+from . import fast_json
+from . import conditional
 
 # ÖNEMLİ: prefix'i "/api" yapıyoruz
-router = APIRouter(prefix="/api", tags=["leases"])
+router = APIRouter(prefix="/api", tags=["leases"], default_response_class=fast_json.FastJSONResponse)
 
 LEASES_CSV = Path("/var/lib/kea/kea-leases4.csv")
 
@@ -13,76 +21,170 @@ EXPECTED_COLS = [
     "subnet_id","fqdn_fwd","fqdn_rev","hostname","state","user_context"
 ]
 
+DEFAULT_IDX = {
+    "address":0,"hwaddr":1,"client_id":2,"valid_lifetime":3,"expire":4,
+    "subnet_id":5,"fqdn_fwd":6,"fqdn_rev":7,"hostname":8,"state":9,"user_context":10
+}
+
 def _to_int(x):
     try:
         return int(x)
     except:
         return None
 
-def _read_csv():
-    if not LEASES_CSV.exists():
-        raise HTTPException(status_code=404, detail=f"{LEASES_CSV} bulunamadı")
-
-    now = int(time.time())
-    items = []
-
-    with LEASES_CSV.open("r", encoding="utf-8", errors="ignore") as f:
-        reader = csv.reader(f)
-        header = next(reader, None)
-
-        has_header = isinstance(header, list) and header and header[0].strip().lower() == "address"
-        idx = {}
+class LeaseStore:
+    """
+    Kea memfile CSV'sini bellekte IP -> lease olarak tutar.
+
+    Kea dosyaya LFC (lease file cleanup) çalışana kadar sadece ekleme yapar;
+    bu yüzden dosya büyüdüğünde yalnızca eklenen kuyruk parse edilir (aynı IP
+    için en yeni kayıt geçerli). inode değişirse veya dosya küçülürse (LFC
+    sonrası) tüm dosya yeniden okunur.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.inode: Optional[int] = None
+        self.offset = 0
+        self.mtime = 0
+        self.idx: Optional[Dict[str, Optional[int]]] = None
+        self.feed = lease_events.LeaseFeed()
+        self.index = lease_index.LeaseIndex(self.feed)
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def _parse_header(self, row: List[str]) -> bool:
+        has_header = bool(row) and row[0].strip().lower() == "address"
         if has_header:
-            hn = [h.strip().lower() for h in header]
-            for name in EXPECTED_COLS:
-                idx[name] = hn.index(name) if name in hn else None
+            hn = [h.strip().lower() for h in row]
+            self.idx = {name: (hn.index(name) if name in hn else None) for name in EXPECTED_COLS}
         else:
-            idx = {
-                "address":0,"hwaddr":1,"client_id":2,"valid_lifetime":3,"expire":4,
-                "subnet_id":5,"fqdn_fwd":6,"fqdn_rev":7,"hostname":8,"state":9,"user_context":10
-            }
-            if header:
-                reader = [[*header], *list(reader)]
-
-        for row in reader:
+            self.idx = dict(DEFAULT_IDX)
+        return has_header
+
+    def _row_record(self, row: List[str]):
+        """
+        CSV satırı -> (ip, kayıt); silme kaydı için kayıt None.
+        """
+        idx = self.idx
+
+        def col(name, default=""):
+            i = idx.get(name)
+            return (row[i].strip() if (i is not None and i < len(row)) else default)
+
+        ip = col("address")
+        vlt = _to_int(col("valid_lifetime"))
+
+        # Kea silinen lease'i valid_lifetime=0 ile ekler
+        if vlt == 0:
+            return ip, None
+
+        exp = _to_int(col("expire"))
+        state = _to_int(col("state"))
+        return ip, {
+            "ip": ip,
+            "mac": col("hwaddr").lower(),
+            "client_id": col("client_id"),
+            "hostname": col("hostname"),
+            "subnet_id": col("subnet_id"),
+            "state": (state if state is not None else -1),
+            "valid_lft": vlt,
+            "expire": exp,
+            "expire_human": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(exp)) if exp else "",
+        }
+
+    def _parse(self, data: bytes, first: bool):
+        """
+        Satırları sırayla (ip, kayıt) olarak verir.
+        """
+        reader = csv.reader(io.StringIO(data.decode("utf-8", errors="ignore")))
+        rows = reader
+        if first:
+            header = next(reader, None)
+            if header is None:
+                self.idx = dict(DEFAULT_IDX)
+                return
+            if not self._parse_header(header):
+                rows = [header, *reader]
+        for row in rows:
             if not row or not row[0] or row[0].startswith("#"):
                 continue
-
-            def col(name, default=""):
-                i = idx.get(name)
-                return (row[i].strip() if (i is not None and i < len(row)) else default)
-
-            ip       = col("address")
-            mac      = col("hwaddr").lower()
-            clientid = col("client_id")
-            vlt      = _to_int(col("valid_lifetime"))
-            exp      = _to_int(col("expire"))
-            subnet   = col("subnet_id")
-            hostn    = col("hostname")
-            state    = _to_int(col("state"))
-
-            remaining = (exp - now) if (exp and exp > now) else 0
-            expire_h  = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(exp)) if exp else ""
-
-            items.append({
-                "ip": ip, "mac": mac, "client_id": clientid, "hostname": hostn,
-                "subnet_id": subnet, "state": (state if state is not None else -1),
-                "valid_lft": vlt, "expire": exp, "expire_human": expire_h,
-                "remaining_secs": remaining
-            })
-
-    def ipkey(x):
-        try:
-            return list(map(int, x["ip"].split(".")))
-        except:
-            return [999, 999, 999, 999]
-
-    items.sort(key=ipkey)
-
-    mtime = int(os.path.getmtime(LEASES_CSV))
+            yield self._row_record(row)
+
+    def refresh(self) -> bool:
+        """
+        Dosya değiştiyse belleği günceller. En az bir kayıt eklendi/değişti/
+        silindiyse True döner (yarım satır eklenmesi değişiklik sayılmaz).
+        """
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                raise HTTPException(status_code=404, detail=f"{self.path} bulunamadı")
+
+            full = st.st_ino != self.inode or st.st_size < self.offset
+            if not full and st.st_size == self.offset:
+                self.index.expire_due()
+                return False
+
+            with self.path.open("rb") as f:
+                start = 0 if full else self.offset
+                f.seek(start)
+                data = f.read(st.st_size - start)
+
+            # Sadece tam satırlar; yarım kalan son satır bir sonraki turda okunur
+            complete = data[:data.rfind(b"\n") + 1]
+            version = self.index.version
+
+            # İlk yüklemede event üretilmez; sonrakilerde farklar yayınlanır
+            emit = self.loaded
+            if full:
+                # LFC sonrası tam liste: aynı IP için en yeni kayıt, sonra farkla eşitle
+                self.idx = None
+                latest: Dict[str, Optional[Dict[str, Any]]] = {}
+                for ip, rec in self._parse(complete, first=True):
+                    latest[ip] = rec
+                self.index.sync((r for r in latest.values() if r is not None), emit)
+            else:
+                # Önceki turlarda hiç tam satır okunmadıysa başlık hâlâ dosyanın başında
+                for ip, rec in self._parse(complete, first=start == 0):
+                    if rec is None:
+                        self.index.drop(ip, emit)
+                    else:
+                        self.index.put(rec, emit)
+            self.index.expire_due(emit=emit)
+            self.loaded = True
+
+            self.inode = st.st_ino
+            self.offset = start + len(complete)
+            changed = self.index.version != version
+            if changed:
+                # meta.mtime ETag ile tutarlı kalsın: sadece içerik değişince
+                self.mtime = int(st.st_mtime)
+            return changed
+
+    def query(self, **filters) -> Dict[str, Any]:
+        with self._lock:
+            return lease_index.query(self.index, **filters)
+
+    def stats(self, pools: Dict[str, Dict[str, Any]], expiring_within: int) -> Dict[str, Any]:
+        with self._lock:
+            return lease_index.stats(self.index, pools, expiring_within)
+
+
+store = LeaseStore(LEASES_CSV)
+
+
+def _read_csv(**filters):
+    res = store.query(**filters)
+
+    mtime = store.mtime
     return {
-        "count": len(items),
-        "items": items,
+        "count": res["count"],
+        "items": res["items"],
+        "page": res["page"],
+        "limit": res["limit"],
+        "pages": res["pages"],
         "meta": {
             "source": str(LEASES_CSV),
             "mtime": mtime,
@@ -92,5 +194,50 @@ def _read_csv():
 
 # ÖNEMLİ: path = "/leases"
 @router.get("/leases", summary="Kea CSV -> JSON lease listesi")
-def list_leases():
-    return _read_csv()
+def list_leases(
+    request: Request,
+    subnet_id: Optional[str] = None,
+    state: Optional[int] = None,
+    mac: Optional[str] = Query(None, description="MAC öneki"),
+    hostname: Optional[str] = Query(None, description="Hostname öneki"),
+    cidr: Optional[str] = Query(None, description="Ör. 10.0.0.0/24"),
+    expiring_within: Optional[int] = Query(None, ge=0, description="N saniye içinde bitenler"),
+    sort: str = Query("ip", description="ip, mac, hostname, subnet_id, state, expire, remaining_secs; azalan için '-' öneki"),
+    page: int = Query(1, ge=1),
+    limit: Optional[int] = Query(None, ge=1, le=lease_index.MAX_LIMIT),
+    format: str = Query("json", description="json veya ndjson (satır başına bir lease)"),
+):
+    filters = dict(
+        subnet_id=subnet_id, state=state, mac=mac, hostname=hostname, cidr=cidr,
+        expiring_within=expiring_within, sort=sort, page=page, limit=limit,
+    )
+    store.refresh()
+    # Lease'ler değişmediyse sorgu hiç çalışmaz
+    etag = lease_index.etag(store.index, "csv", format=format, **filters)
+    if conditional.not_modified(request, etag):
+        return conditional.not_modified_response(etag)
+
+    res = _read_csv(**filters)
+    items = res.pop("items")
+    return conditional.stream_response(request, etag, res, "items", items, format)
+
+@router.get("/leases/stats", summary="Subnet bazlı lease / pool kullanım sayaçları")
+def lease_stats(expiring_within: int = Query(3600, ge=0, description="expiring_soon penceresi (sn)")):
+    store.refresh()
+    res = store.stats(kea_pools.pools_from_file(), expiring_within)
+    res["meta"] = {"source": str(LEASES_CSV), "pools": str(kea_pools.KEA_DHCP4_CONF), "mtime": store.mtime}
+    return res
+
+@router.get("/leases/changes", summary="Lease değişiklikleri (add/renew/release/expire)")
+def lease_changes(since: int = Query(0, ge=0, description="Son görülen seq")):
+    store.refresh()
+    return store.feed.since(since)
+
+async def _refresh_async() -> None:
+    await asyncio.to_thread(store.refresh)
+
+@router.get("/leases/stream", summary="Lease değişiklikleri (SSE)")
+async def lease_changes_stream(since: Optional[int] = Query(None, ge=0, description="Son görülen seq")):
+    # İlk yenileme hatası cevap başlamadan HTTP hatası olarak döner
+    await _refresh_async()
+    return StreamingResponse(lease_events.event_stream(store.feed, _refresh_async, since), media_type="text/event-stream")
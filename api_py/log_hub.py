@@ -0,0 +1,113 @@
+"""
+Log akışları için fan-out hub.
+
+Aynı kaynağı (systemd unit, container log dosyası) izleyen tüm SSE istemcileri
+tek bir upstream follower'ı (journalctl -f, file_follow) paylaşır. Satırlar her
+istemcinin sınırlı kuyruğuna dağıtılır; kuyruk dolarsa en eski satırlar düşer
+(yavaş bir tarayıcı upstream'i veya diğer izleyicileri bekletmez).
+Son abone ayrılınca upstream kapatılır.
+
+Kullanım:
+    async with hub.subscribe(("journal", unit), lambda: follow_unit(unit)) as sub:
+        while True:
+            lines = await sub.get()
+"""
+
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Hashable, List, Optional, Set
+
+# İstemci başına bekleyen azami satır
+QUEUE_MAX_LINES = 2000
+
+Upstream = Callable[[], AsyncIterator[List[str]]]
+
+
+class Subscription:
+    """
+    Drop-oldest davranışlı sınırlı satır kuyruğu.
+    """
+
+    def __init__(self, max_lines: int = QUEUE_MAX_LINES):
+        self._lines: deque = deque(maxlen=max_lines)
+        self._ready = asyncio.Event()
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, lines: List[str]) -> None:
+        overflow = len(self._lines) + len(lines) - self._lines.maxlen
+        if overflow > 0:
+            self.dropped += overflow
+        self._lines.extend(lines)
+        self._ready.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+
+    async def get(self) -> List[str]:
+        """
+        Bekleyen tüm satırları tek batch olarak döner; upstream kapandıysa
+        ve kuyruk boşsa boş liste döner.
+        """
+        while not self._lines and not self.closed:
+            self._ready.clear()
+            await self._ready.wait()
+        batch = list(self._lines)
+        self._lines.clear()
+        return batch
+
+
+class _Channel:
+    def __init__(self):
+        self.subs: Set[Subscription] = set()
+        self.task: Optional["asyncio.Task[None]"] = None
+
+
+class LogHub:
+    def __init__(self):
+        self._channels: Dict[Hashable, _Channel] = {}
+
+    async def _pump(self, key: Hashable, ch: _Channel, upstream: Upstream) -> None:
+        try:
+            async for lines in upstream():
+                for sub in list(ch.subs):
+                    sub.put(lines)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            for sub in list(ch.subs):
+                sub.put([f"[ERROR] log akışı kesildi: {e}"])
+        finally:
+            for sub in list(ch.subs):
+                sub.close()
+            if self._channels.get(key) is ch:
+                del self._channels[key]
+
+    @asynccontextmanager
+    async def subscribe(self, key: Hashable, upstream: Upstream) -> AsyncIterator[Subscription]:
+        ch = self._channels.get(key)
+        if ch is None:
+            ch = _Channel()
+            self._channels[key] = ch
+        sub = Subscription()
+        ch.subs.add(sub)
+        if ch.task is None:
+            ch.task = asyncio.create_task(self._pump(key, ch, upstream))
+        try:
+            yield sub
+        finally:
+            ch.subs.discard(sub)
+            if not ch.subs:
+                if self._channels.get(key) is ch:
+                    del self._channels[key]
+                if ch.task is not None and not ch.task.done():
+                    ch.task.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        return {str(k): len(ch.subs) for k, ch in self._channels.items()}
+
+
+# Uygulama genelinde paylaşılan hub
+hub = LogHub()
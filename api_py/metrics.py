@@ -0,0 +1,151 @@
+"""
+Servisin kendi ölçümleri (Prometheus text formatı, ek bağımlılık yok).
+
+- `Histogram`: sabit bucket'lı, label'lı süre histogramı
+- `Counter`: label'lı sayaç
+- `render()`: /metrics çıktısı
+
+Ölçülen aşamalar: target probe'ları (connect / TTFB / toplam), subprocess
+çağrıları (systemctl, journalctl, uname), Docker API istekleri ve HTTP
+handler süreleri.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Saniye cinsinden varsayılan bucket'lar (1 ms .. 10 s)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def lines(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def lines(self) -> Iterator[str]:
+        yield from super().lines()
+        with self._lock:
+            items = list(self._values.items())
+        for key, v in items:
+            yield f"{self.name}{_labels(self.labelnames, key)} {v}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label değerleri -> [bucket sayaçları..., toplam, adet]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            v = self._values.get(key)
+            if v is None:
+                v = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    v[i] += 1
+                    break
+            v[-2] += value
+            v[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def lines(self) -> Iterator[str]:
+        yield from super().lines()
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        for key, v in items:
+            acc = 0.0
+            for b, c in zip(self.buckets, v):
+                acc += c
+                le = _labels(self.labelnames, key, 'le="%s"' % b)
+                yield f"{self.name}_bucket{le} {acc}"
+            le = _labels(self.labelnames, key, 'le="+Inf"')
+            yield f"{self.name}_bucket{le} {v[-1]}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {v[-2]}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {v[-1]}"
+
+
+def render() -> str:
+    return "\n".join(line for m in _registry for line in m.lines()) + "\n"
+
+
+# Ortak metrikler
+PROBE_SECONDS = Histogram(
+    "ife_probe_duration_seconds", "Target probe süresi (check_one)", ["target"],
+)
+PROBE_STAGE_SECONDS = Histogram(
+    "ife_probe_stage_seconds", "Probe aşama süreleri (connect, tls, ttfb, total; outcome=ok|error)",
+    ["endpoint", "kind", "stage", "outcome"],
+)
+SUBPROCESS_SECONDS = Histogram(
+    "ife_subprocess_duration_seconds", "Biten subprocess çağrılarının süresi", ["cmd"],
+)
+SUBPROCESS_SPAWNS = Counter(
+    "ife_subprocess_spawns_total", "Başlatılan subprocess sayısı (uzun ömürlü akışlar dahil)", ["cmd"],
+)
+DOCKER_API_SECONDS = Histogram(
+    "ife_docker_api_duration_seconds", "Docker Engine API istek süresi", ["method", "endpoint"],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "ife_http_request_duration_seconds", "HTTP handler süresi (cevap başlayana kadar)", ["method", "route", "status"],
+)
+
+
+@contextmanager
+def subprocess_timer(cmd: str) -> Iterator[None]:
+    SUBPROCESS_SPAWNS.inc(cmd=cmd)
+    with SUBPROCESS_SECONDS.time(cmd=cmd):
+        yield
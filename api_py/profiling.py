@@ -0,0 +1,118 @@
+"""
+Opt-in profil araçları (config.yaml -> `profiling.enabled: true`).
+
+- Yavaş istek logu: route bazlı eşik (`slow_ms`, `routes`) aşılırsa
+  stdout'a yazılır ve son SLOW_LOG_SIZE kayıt bellekte tutulur.
+- Sampling profiler: `GET /api/admin/profile?seconds=N` süresince
+  `sys._current_frames()` ile thread stack'lerini örnekler ve
+  flamegraph.pl / speedscope uyumlu "collapsed stack" metni döner.
+
+Kapalıyken router app'e eklenmez ve middleware sadece tek bir bool
+kontrolü yapar; ek maliyet yoktur.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+router = APIRouter(prefix="/api/admin/profile", tags=["profiling"])
+
+SLOW_LOG_SIZE = 200
+MAX_PROFILE_SECS = 60
+
+enabled = False
+_slow_ms = 500.0
+_route_ms: Dict[str, float] = {}
+_admin_token: Optional[str] = None
+_slow_log: deque = deque(maxlen=SLOW_LOG_SIZE)
+_profile_lock = threading.Lock()
+
+
+def configure(conf: Optional[Dict[str, Any]]) -> None:
+    """
+    config.yaml `profiling` bölümü:
+      enabled: true
+      slow_ms: 500            # varsayılan eşik
+      routes: {"/api/health": 200}
+      admin_token: "..."      # verilirse X-Admin-Token başlığı zorunlu
+    """
+    global enabled, _slow_ms, _route_ms, _admin_token
+    conf = conf or {}
+    enabled = bool(conf.get("enabled"))
+    _slow_ms = float(conf.get("slow_ms", 500))
+    _route_ms = {str(k): float(v) for k, v in (conf.get("routes") or {}).items()}
+    _admin_token = conf.get("admin_token")
+
+
+def check_slow(method: str, route: str, status: int, secs: float) -> None:
+    ms = secs * 1000
+    if ms < _route_ms.get(route, _slow_ms):
+        return
+    entry = {"ts": time.time(), "method": method, "route": route, "status": status, "ms": round(ms, 1)}
+    _slow_log.append(entry)
+    print(f"yavaş istek: {method} {route} -> {status} {ms:.0f} ms")
+
+
+def _check_token(token: Optional[str]) -> None:
+    if _admin_token and token != _admin_token:
+        raise HTTPException(status_code=403, detail="Geçersiz admin token")
+
+
+def _frame_stack(frame) -> List[str]:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def sample(seconds: float, interval: float, main_only: bool) -> str:
+    """
+    Thread stack'lerini örnekler; her satır "thread;kök;...;yaprak adet".
+    """
+    me = threading.get_ident()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    main = threading.main_thread().ident
+    counts: Counter = Counter()
+
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        for ident, frame in sys._current_frames().items():
+            if ident == me or (main_only and ident != main):
+                continue
+            stack = [names.get(ident, str(ident)), *_frame_stack(frame)]
+            counts[";".join(s.replace(";", ":") for s in stack)] += 1
+        time.sleep(interval)
+
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+
+
+@router.get("", response_class=PlainTextResponse, summary="Sampling profiler (collapsed stack)")
+async def run_profile(
+    seconds: float = Query(5, gt=0, le=MAX_PROFILE_SECS),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    main_only: bool = Query(True, description="Sadece event loop (ana) thread'i"),
+    x_admin_token: Optional[str] = Header(None),
+):
+    _check_token(x_admin_token)
+    if not _profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="Profiler zaten çalışıyor")
+    try:
+        # Örnekleme ayrı thread'de; event loop çalışmaya devam eder ve örneklenir
+        return await asyncio.to_thread(sample, seconds, interval_ms / 1000, main_only)
+    finally:
+        _profile_lock.release()
+
+
+@router.get("/slow", summary="Son yavaş istekler")
+async def slow_requests(x_admin_token: Optional[str] = Header(None)):
+    _check_token(x_admin_token)
+    return {"slow_ms": _slow_ms, "routes": _route_ms, "items": list(reversed(_slow_log))}
@@ -1,9 +1,14 @@
-import asyncio, shlex
+import asyncio, base64, json, shlex
 from pathlib import Path
-from typing import Any, AsyncIterator, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 
+from . import journal_reader
+from . import fast_json
+from . import metrics
+from .log_hub import hub
+
 # Ubuntu'da runtime journal genelde /run/log/journal,
 # persistent açıksa /var/log/journal da olur.
 JOURNAL_DIRS = [
@@ -15,6 +20,7 @@ JOURNAL_DIRS = [
 router = APIRouter(
     prefix="/api/system-logs",
     tags=["system-logs"],
+    default_response_class=fast_json.FastJSONResponse,
 )
 
 SERVICES = [
@@ -25,20 +31,28 @@ SERVICES = [
 ]
 
 
+# Tüm unit'ler için tek journal handle'ı ile okuyan, cursor saklayan okuyucu
+_journal = journal_reader.JournalTail(
+    [svc["unit"] for svc in SERVICES],
+    [d for d in JOURNAL_DIRS if d],
+)
+
+
 async def _run(cmd: str) -> str:
-    proc = await asyncio.create_subprocess_shell(
-        cmd,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
-    out, err = await proc.communicate()
+    with metrics.subprocess_timer("journalctl"):
+        proc = await asyncio.create_subprocess_shell(
+            cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        out, err = await proc.communicate()
     if proc.returncode != 0:
         msg = (err or out).decode(errors="replace").strip()
         return f"[ERROR] {msg or 'journalctl komutu başarısız'}"
     return out.decode(errors="replace")
 
 
-async def _get_logs_for_unit(unit: str, lines: int) -> str:
+async def _get_logs_for_unit(unit: str, lines: int, after_cursor: Optional[str] = None) -> str:
     """
     Aynı unit için sırayla:
       /run/log/journal
@@ -46,19 +60,24 @@ async def _get_logs_for_unit(unit: str, lines: int) -> str:
       (sonra defaults)
     üzerinde dene.
     İlk "gerçek" sonuçta dur.
+    Çıktının sonunda `-- cursor: ...` satırı bulunur (bkz. _split_cursor).
     """
+    extra = "--show-cursor"
+    if after_cursor:
+        extra += f" --after-cursor={shlex.quote(after_cursor)}"
+
     last_output = ""
     for d in JOURNAL_DIRS:
         if d:
             cmd = (
                 f"journalctl -D {shlex.quote(d)} "
                 f"-u {shlex.quote(unit)} "
-                f"-n {int(lines)} --no-pager --output=short"
+                f"-n {int(lines)} --no-pager --output=short {extra}"
             )
         else:
             cmd = (
                 f"journalctl -u {shlex.quote(unit)} "
-                f"-n {int(lines)} --no-pager --output=short"
+                f"-n {int(lines)} --no-pager --output=short {extra}"
             )
 
         out = await _run(cmd)
@@ -92,14 +111,86 @@ def _select_journal_dir() -> Optional[str]:
             return d
     return None
 
-# Tüm system service loglarını döner
+# journalctl --show-cursor çıktısını (metin, cursor) olarak ayırır
+def _split_cursor(out: str) -> Tuple[str, Optional[str]]:
+    head, sep, tail = out.rstrip("\n").rpartition("\n-- cursor: ")
+    if sep:
+        return head + "\n", tail.strip()
+    if out.startswith("-- cursor: "):
+        return "", out[len("-- cursor: "):].strip()
+    return out, None
+
+# İstemciye verilen opak cursor: {unit: journal cursor} -> base64url(JSON)
+def _encode_cursor(cursors: Dict[str, Optional[str]]) -> str:
+    raw = json.dumps({u: c for u, c in cursors.items() if c}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(token: Optional[str]) -> Dict[str, Optional[str]]:
+    if not token:
+        return {}
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw)
+        if not isinstance(data, dict):
+            raise ValueError
+        return {str(k): str(v) for k, v in data.items()}
+    except Exception:
+        raise HTTPException(status_code=400, detail="Geçersiz since cursor")
+
+# Unit'lerin son `lines` kaydı (since verilirse cursor sonrası);
+# önce native journal okuyucu, olmazsa journalctl.
+# Dönüş: unit -> {"logs", "cursor", "incremental"}
+async def _get_logs_for_all_units(
+    lines: int,
+    units: Optional[List[str]] = None,
+    since: Optional[Dict[str, Optional[str]]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    units = units or [svc["unit"] for svc in SERVICES]
+    since = since or {}
+
+    if journal_reader.available() and journal_reader.journal_files(_journal.dirs):
+        try:
+            per_unit = await asyncio.to_thread(_journal.since, since, lines)
+            result = {}
+            for u in units:
+                got, cur, incremental = per_unit[u]
+                if got:
+                    logs = "\n".join(got) + "\n"
+                else:
+                    logs = "" if incremental else "-- No entries --\n"
+                result[u] = {"logs": logs, "cursor": cur, "incremental": incremental}
+            return result
+        except OSError:
+            pass
+
+    outs = await asyncio.gather(*[_get_logs_for_unit(u, lines, since.get(u)) for u in units])
+    result = {}
+    for u, out in zip(units, outs):
+        text, cur = _split_cursor(out)
+        incremental = bool(since.get(u)) and "[ERROR]" not in text
+        if incremental and "-- No entries --" in text:
+            text = ""
+        result[u] = {"logs": text, "cursor": cur or since.get(u), "incremental": incremental}
+    return result
+
+# Tüm (veya tek) system service loglarını döner.
+# since: önceki cevaptaki next_cursor -> sadece yeni satırlar döner
 @router.get("")
-async def get_all_system_logs(lines: int = 80):
+async def get_all_system_logs(lines: int = 80, service: Optional[str] = None, since: Optional[str] = None, format: str = "json"):
+    services = SERVICES
+    if service:
+        services = [svc for svc in SERVICES if svc["id"] == service]
+        if not services:
+            raise HTTPException(status_code=404, detail=f"System service bulunamadı: {service}")
+
     items: List[Dict[str, Any]] = []
+    logs_by_unit = await _get_logs_for_all_units(
+        lines, [svc["unit"] for svc in services], _decode_cursor(since)
+    )
 
-    for svc in SERVICES:
+    for svc in services:
         unit = svc["unit"]
-        logs = await _get_logs_for_unit(unit, lines)
+        res = logs_by_unit[unit]
 
         items.append(
             {
@@ -107,11 +198,17 @@ async def get_all_system_logs(lines: int = 80):
                 "name": svc["name"],
                 "unit": unit,
                 "lines": lines,
-                "logs": logs,
+                "logs": res["logs"],
+                "cursor": res["cursor"],
+                "incremental": res["incremental"],
             }
         )
 
-    return {"items": items, "lines": lines}
+    head = {
+        "lines": lines,
+        "next_cursor": _encode_cursor({u: r["cursor"] for u, r in logs_by_unit.items()}),
+    }
+    return fast_json.respond(head, "items", items, format)
 
 # Belirtilen service_id için system log akışı döner
 @router.get("/stream/{service_id}")
@@ -120,43 +217,61 @@ async def stream_system_logs(service_id: str, tail: int = 200):
     if not unit:
         raise HTTPException(status_code=404, detail=f"System service bulunamadı: {service_id}")
 
-    # Canlı log akışı için SSE endpoint
-    async def event_stream() -> AsyncIterator[str]:
+    # Unit başına tek `journalctl -f` (tüm izleyiciler paylaşır)
+    async def upstream() -> AsyncIterator[List[str]]:
         journal_dir = _select_journal_dir()
-        # journalctl komutunu hazırla
+        # journalctl komutunu hazırla (geçmiş satırlar abone başına ayrıca okunur)
         if journal_dir:
             cmd = (
                 f"journalctl -D {shlex.quote(journal_dir)} "
                 f"-u {shlex.quote(unit)} "
-                f"-n {int(tail)} -f --no-pager --output=short"
+                f"-n 0 -f --no-pager --output=short"
             )
         else:
             cmd = (
                 f"journalctl -u {shlex.quote(unit)} "
-                f"-n {int(tail)} -f --no-pager --output=short"
+                f"-n 0 -f --no-pager --output=short"
             )
         # Log akış süreci başlat
+        metrics.SUBPROCESS_SPAWNS.inc(cmd="journalctl-follow")
         proc = await asyncio.create_subprocess_shell(
             cmd,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
         )
 
-        # Log satırlarını oku ve SSE formatında yayınla
+        # Log satırlarını oku
         try:
             assert proc.stdout is not None
             while True:
                 line = await proc.stdout.readline()
                 if not line:
-                    await asyncio.sleep(0.2)
-                    continue
+                    return
                 text = line.decode(errors="replace").rstrip("\n")
                 if text:
-                    yield _sse_pack(text)
-        except asyncio.CancelledError:
-            proc.terminate()
-            return
+                    yield [text]
         finally:
-            proc.terminate()
+            if proc.returncode is None:
+                proc.terminate()
+
+    # Canlı log akışı için SSE endpoint
+    async def event_stream() -> AsyncIterator[str]:
+        async with hub.subscribe(("journal", unit), upstream) as sub:
+            # Geçmiş loglar
+            if tail and tail > 0:
+                history = (await _get_logs_for_all_units(tail, [unit]))[unit]["logs"]
+                for text in history.splitlines():
+                    if text and text != "-- No entries --":
+                        yield _sse_pack(text)
+
+            # Log satırlarını SSE formatında yayınla
+            try:
+                while True:
+                    lines = await sub.get()
+                    if not lines:
+                        return
+                    yield _sse_pack("\n".join(lines))
+            except asyncio.CancelledError:
+                return
 
     return StreamingResponse(event_stream(), media_type="text/event-stream")
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""
+Systemd unit durumları için ortak sağlayıcı.
+
+Tüm bilinen unit'ler tek bir `systemctl show -p ... unit1 unit2 ...` çağrısı ile
+okunur ve kısa bir TTL boyunca cache'lenir. Böylece /api/health ve
+/api/system-services her unit için ayrı process başlatmaz.
+
+Kullanım:
+    register(["nginx.service"])
+    unit_states(["nginx.service"])  -> {"nginx.service": {"active_state": "active", ...}}
+    is_active("nginx.service")      -> True / False / None (bilinmiyor)
+"""
+
+import subprocess
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from . import metrics
+
+SYSTEMCTL = "systemctl"
+PROPS = ["ActiveState", "SubState", "MainPID", "FragmentPath"]
+TTL_SECS = 2.0
+
+_lock = threading.Lock()
+_known: Dict[str, None] = {}   # sıralı set
+_cache: Dict[str, Optional[Dict[str, Any]]] = {}
+_fetched_at: Dict[str, float] = {}
+_bad: Set[str] = set()         # toplu çağrıyı bozan unit'ler (tek tek sorgulanır)
+
+
+def register(units: Iterable[str]) -> None:
+    """
+    Her fetch'te birlikte sorgulanacak unit'leri ekler.
+    """
+    with _lock:
+        for u in units:
+            _known[u] = None
+
+
+def _parse_block(block: str) -> Dict[str, Any]:
+    props: Dict[str, str] = {}
+    for line in block.splitlines():
+        if "=" in line:
+            k, v = line.split("=", 1)
+            props[k] = v
+    try:
+        main_pid = int(props.get("MainPID") or 0)
+    except ValueError:
+        main_pid = 0
+    return {
+        "active_state": props.get("ActiveState"),
+        "sub_state": props.get("SubState"),
+        "main_pid": main_pid,
+        "fragment_path": props.get("FragmentPath") or None,
+    }
+
+
+def _run(units: List[str]) -> Optional[List[str]]:
+    """
+    Tek `systemctl show` çağrısı; hata veya blok sayısı uyuşmazlığında None.
+    systemctl blokları argüman sırasıyla, boş satırla ayrılmış basar (alias
+    unit'lerde Id farklı olabileceği için eşleştirme sıraya göre yapılır).
+    """
+    try:
+        with metrics.subprocess_timer("systemctl"):
+            res = subprocess.run(
+                [SYSTEMCTL, "show", "-p", ",".join(PROPS), "--", *units],
+                capture_output=True,
+                text=True,
+                check=False,
+            )
+    except Exception:
+        return None
+
+    blocks = [b for b in res.stdout.strip().split("\n\n")]
+    if res.returncode != 0 or len(blocks) != len(units):
+        return None
+    return blocks
+
+
+def _fetch(units: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Unit'leri tek process ile okur. Toplu çağrı başarısız olursa unit'ler tek
+    tek denenir; hatalı bir unit adı sadece kendi sonucunu etkiler ve sonraki
+    fetch'lerde toplu çağrının dışında tutulur.
+    """
+    out: Dict[str, Optional[Dict[str, Any]]] = {}
+    batch = [u for u in units if u not in _bad]
+    single = [u for u in units if u in _bad]
+
+    if batch:
+        blocks = _run(batch)
+        if blocks is not None:
+            out.update((u, _parse_block(b)) for u, b in zip(batch, blocks))
+        else:
+            single = units
+
+    for u in single:
+        blocks = _run([u])
+        if blocks is None:
+            _bad.add(u)
+            out[u] = None
+        else:
+            _bad.discard(u)
+            out[u] = _parse_block(blocks[0])
+    return out
+
+
+def unit_states(units: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    İstenen unit'lerin durumunu döner; cache bayatsa bilinen tüm unit'ler
+    tek çağrıda yenilenir. Okunamayan unit'ler için değer None olur.
+    """
+    wanted = list(dict.fromkeys(units))
+    with _lock:
+        t = time.monotonic()
+        stale = [u for u in wanted if t - _fetched_at.get(u, float("-inf")) >= TTL_SECS]
+        if stale:
+            for u in wanted:
+                _known[u] = None
+            batch = list(_known)
+            fresh = _fetch(batch)
+            t = time.monotonic()
+            for u in batch:
+                _cache[u] = fresh.get(u)
+                _fetched_at[u] = t
+        return {u: _cache.get(u) for u in wanted}
+
+
+def is_active(unit: str) -> Optional[bool]:
+    st = unit_states([unit])[unit]
+    if st is None:
+        return None
+    return st.get("active_state") == "active"
@@ -0,0 +1,62 @@
+import asyncio
+
+from api_py import file_follow
+
+
+async def _collect(gen, count, timeout=3.0):
+    lines = []
+    while len(lines) < count:
+        lines += await asyncio.wait_for(gen.__anext__(), timeout)
+    return lines
+
+
+def test_append(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_bytes(b"one\ntwo\n")
+
+    async def run():
+        gen = file_follow.follow(path, from_end=False)
+        assert await _collect(gen, 2) == ["one", "two"]
+        with path.open("ab") as f:
+            f.write(b"three\n")
+        assert await _collect(gen, 1) == ["three"]
+        await gen.aclose()
+
+    asyncio.run(run())
+
+
+def test_truncate_and_rewrite_same_length(tmp_path):
+    # copytruncate + hızlı yazma: boyut değişmediği için tell() kontrolü kaçırır
+    path = tmp_path / "app.log"
+    path.write_bytes(b"aaaa\nbbbb\n")
+
+    async def run():
+        gen = file_follow.follow(path, from_end=False)
+        assert await _collect(gen, 2) == ["aaaa", "bbbb"]
+        with path.open("r+b") as f:
+            f.truncate(0)
+            f.write(b"cccc\ndddd\n")
+        assert await _collect(gen, 2) == ["cccc", "dddd"]
+        await gen.aclose()
+
+    asyncio.run(run())
+
+
+def test_truncate_and_rewrite_longer(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_bytes(b"aaaa\n")
+
+    async def run():
+        gen = file_follow.follow(path, from_end=True)
+        first = asyncio.ensure_future(gen.__anext__())
+        # Dosya açılıp sonuna gidilene kadar bekle
+        await asyncio.sleep(0.2)
+        with path.open("r+b") as f:
+            f.truncate(0)
+            f.write(b"xxxx\nyyyy\n")
+        lines = await asyncio.wait_for(first, 3.0)
+        lines += await _collect(gen, 2 - len(lines))
+        assert lines == ["xxxx", "yyyy"]
+        await gen.aclose()
+
+    asyncio.run(run())